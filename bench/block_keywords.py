@@ -0,0 +1,76 @@
+"""
+屏蔽词匹配基准：逐词 `in` 扫描 vs Aho-Corasick 自动机
+
+用法（插件根目录下）：
+    python -m bench.block_keywords [--messages 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from functools import partial
+
+from core.automaton import AhoCorasick
+
+# 常用汉字区间，用于生成随机词与消息
+_CJK_START, _CJK_END = 0x4E00, 0x4E00 + 3000
+
+
+def _rand_text(rng: random.Random, lo: int, hi: int) -> str:
+    return "".join(
+        chr(rng.randint(_CJK_START, _CJK_END)) for _ in range(rng.randint(lo, hi))
+    )
+
+
+def _loop_search(keywords: list[str], text: str) -> str | None:
+    for w in keywords:
+        if w in text:
+            return w
+    return None
+
+
+def _measure(fn, messages: list[str]) -> tuple[float, int]:
+    hits = 0
+    start = time.perf_counter()
+    for msg in messages:
+        if fn(msg) is not None:
+            hits += 1
+    return (time.perf_counter() - start) / len(messages) * 1e6, hits
+
+
+def run(sizes: list[int], n_messages: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    messages = [_rand_text(rng, 5, 60) for _ in range(n_messages)]
+
+    print(
+        f"{'keywords':>9} {'build(ms)':>10} {'loop(us)':>10} {'ac(us)':>9} {'speedup':>8}"
+    )
+    for size in sizes:
+        keywords = [_rand_text(rng, 2, 4) for _ in range(size)]
+        start = time.perf_counter()
+        matcher = AhoCorasick(keywords)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        loop_us, loop_hits = _measure(partial(_loop_search, keywords), messages)
+        ac_us, ac_hits = _measure(matcher.search, messages)
+        assert loop_hits == ac_hits, "匹配结果不一致"
+        print(
+            f"{size:>9} {build_ms:>10.1f} {loop_us:>10.1f} {ac_us:>9.2f} "
+            f"{loop_us / ac_us:>7.0f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.messages)
+
+
+if __name__ == "__main__":
+    main()
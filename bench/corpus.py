@@ -0,0 +1,160 @@
+"""
+合成中文群聊语料
+
+按比例混合以下几类消息，覆盖各步骤的主要分支：
+- chatter：日常短句闲聊
+- topic：命中兴趣词 / 问句 / 负面情绪词的句子
+- copypasta：数百字的长复制粘贴文
+- mention：艾特 bot 或带唤醒词
+- reply：引用 bot 或他人的消息
+- image：图片（含少量 GIF）
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from astrbot.core.message.components import (
+    At,
+    BaseMessageComponent,
+    Image,
+    Plain,
+    Reply,
+)
+
+from .fixtures import BOT_ID
+
+_CHATTER = [
+    "哈哈哈",
+    "草",
+    "今天好热",
+    "有人吗",
+    "刚下班",
+    "吃了吗",
+    "笑死",
+    "好家伙",
+    "晚上打游戏不",
+    "这也太离谱了",
+    "明天周末了",
+    "我也想要",
+    "确实",
+    "在吗在吗",
+    "牛啊",
+    "又堵车了",
+]
+
+_TOPIC = [
+    "这个函数为什么一直循环出不来，调试半天了",
+    "算法题里的变量名能不能写点注释",
+    "周末约会去哪里比较浪漫",
+    "怎么才能让女朋友感受到陪伴和关怀",
+    "请问这个报错是什么意思？有人知道吗",
+    "为什么我的代码跑不起来",
+    "好无聊啊，群里都没人说话",
+    "闭嘴吧你，别说了",
+    "你是不是机器人啊，说话像AI",
+    "你这个傻逼",
+]
+
+_COPYPASTA = [
+    (
+        "我是一个平平无奇的打工人，每天早上七点起床，挤一个小时地铁去公司，"
+        "打开电脑第一件事就是看群消息，然后假装很忙地敲键盘，"
+    ),
+    (
+        "家人们谁懂啊，今天出门忘带伞，结果下了一整天的雨，"
+        "衣服全湿了还被老板骂了一顿，回家发现外卖也送错了，"
+    ),
+    "听我说谢谢你，因为有你，温暖了四季，谢谢你，感谢有你，世界更美丽，",
+]
+
+_NAMES = ["宝贝", "宝宝"]
+
+
+@dataclass(slots=True)
+class Sample:
+    kind: str
+    gid: str
+    uid: str
+    chain: list[BaseMessageComponent]
+    is_admin: bool = False
+
+
+# 各类消息的比例
+MIX: dict[str, float] = {
+    "chatter": 0.45,
+    "topic": 0.2,
+    "copypasta": 0.05,
+    "mention": 0.12,
+    "reply": 0.1,
+    "image": 0.08,
+}
+
+
+def _sample(rng: random.Random, kind: str, gid: str, uid: str) -> Sample:
+    if kind == "chatter":
+        text = rng.choice(_CHATTER)
+        if rng.random() < 0.3:
+            text += rng.choice(_CHATTER)
+        return Sample(kind, gid, uid, [Plain(text)])
+    if kind == "topic":
+        return Sample(kind, gid, uid, [Plain(rng.choice(_TOPIC))])
+    if kind == "copypasta":
+        text = rng.choice(_COPYPASTA) * rng.randint(3, 8)
+        return Sample(kind, gid, uid, [Plain(text)])
+    if kind == "mention":
+        if rng.random() < 0.5:
+            chain: list[BaseMessageComponent] = [
+                At(qq=BOT_ID),
+                Plain(rng.choice(_CHATTER + _TOPIC)),
+            ]
+            return Sample(kind, gid, uid, chain)
+        text = f"{rng.choice(_NAMES)}{rng.choice(_CHATTER)}"
+        return Sample(kind, gid, uid, [Plain(text)], is_admin=rng.random() < 0.5)
+    if kind == "reply":
+        sender = BOT_ID if rng.random() < 0.5 else str(rng.randint(20000, 20100))
+        chain = [
+            Reply(id=str(rng.randint(1, 10**9)), sender_id=sender),
+            Plain(rng.choice(_CHATTER + _TOPIC)),
+        ]
+        return Sample(kind, gid, uid, chain)
+    # image
+    suffix = ".gif" if rng.random() < 0.2 else ".jpg"
+    chain = [Image(file=f"https://example.com/{rng.randint(1, 10**6)}{suffix}")]
+    if rng.random() < 0.5:
+        chain.append(Plain(rng.choice(_CHATTER)))
+    return Sample(kind, gid, uid, chain)
+
+
+def stream(
+    n: int, *, groups: int = 20, users: int = 200, seed: int = 42
+) -> Iterator[Sample]:
+    """按 MIX 比例逐条生成 n 条消息，群与用户均匀随机分布"""
+    rng = random.Random(seed)
+    kinds = list(MIX)
+    weights = list(MIX.values())
+    for _ in range(n):
+        yield _sample(
+            rng,
+            rng.choices(kinds, weights)[0],
+            str(100000 + rng.randrange(groups)),
+            str(20000 + rng.randrange(users)),
+        )
+
+
+def generate(
+    n: int, *, groups: int = 20, users: int = 200, seed: int = 42
+) -> list[Sample]:
+    return list(stream(n, groups=groups, users=users, seed=seed))
+
+
+BOT_REPLIES = [
+    "函数一直循环的话，先看看循环条件里的变量有没有更新",
+    "周末可以去看展或者去海边，浪漫又放松",
+    "报错信息贴出来看看，我帮你分析一下",
+    "无聊的话要不要一起玩个小游戏",
+    "好的好的，我不说话了",
+]
+"""bot 近期发言，用于相关性与复读判定"""
@@ -0,0 +1,132 @@
+"""
+防抖挂起请求基准：登记吞吐与批量过期
+
+- register：在若干会话上反复登记挂起请求（同一会话重复登记会替换旧请求），统计每秒登记数
+- expire：一次性登记大量短窗口请求，统计全部过期清理完成的耗时与期间的任务数峰值
+- merge：同一用户在不限合并条数时逐条发出上百条消息，统计每条消息的防抖处理耗时
+
+用法（插件根目录下）：
+    python -m bench.debounce [--registrations 50000] [--keys 2000] [--merges 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from astrbot.core.message.components import Plain
+
+from bench.fixtures import FakeEvent, make_config, make_ctx, reset_state
+from core.model import MergeBuffer, PendingWakeRequest, StateManager
+from core.step import DebounceStep
+
+
+def _pending(event: FakeEvent, now: float) -> PendingWakeRequest:
+    return PendingWakeRequest(
+        event=event,  # type: ignore[arg-type]
+        buffer=MergeBuffer(event.get_messages(), event.message_str),
+        created_at=now,
+    )
+
+
+def _events(n: int) -> list[FakeEvent]:
+    return [FakeEvent("g1", f"u{i}", [Plain(f"消息 {i}")]) for i in range(n)]
+
+
+async def bench_register(registrations: int, keys: int, window: float) -> float:
+    """返回每秒登记数"""
+    reset_state()
+    events = _events(keys)
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(registrations):
+        k = i % keys
+        await StateManager.register_pending_request(
+            f"umo:{k}", _pending(events[k], now), window=window
+        )
+    elapsed = time.perf_counter() - start
+    # 让被替换请求的清理逻辑跑完，计入登记的全部开销
+    await asyncio.sleep(0)
+    reset_state()
+    return registrations / elapsed
+
+
+async def bench_expire(n: int, window: float) -> tuple[float, int]:
+    """返回 (最后一个请求过期后清理完毕的延迟毫秒, 任务数峰值)"""
+    reset_state()
+    events = _events(n)
+    now = time.time()
+    for i, event in enumerate(events):
+        await StateManager.register_pending_request(
+            f"umo:{i}", _pending(event, now), window=window
+        )
+    peak_tasks = len(asyncio.all_tasks())
+    deadline = time.perf_counter() + window
+    while StateManager._pending_requests:
+        await asyncio.sleep(0.001)
+    lag_ms = (time.perf_counter() - deadline) * 1e3
+    reset_state()
+    return lag_ms, peak_tasks
+
+
+async def bench_merge(merges: int) -> tuple[float, float]:
+    """返回 (每条消息平均耗时 us, 最后 10 条的平均耗时 us)"""
+    reset_state()
+    step = DebounceStep(
+        make_config({"debounce": {"listen_seconds": 3600, "max_merge_count": 0}})
+    )
+    now = time.time()
+    costs: list[float] = []
+    ctx = None
+    for i in range(merges):
+        event = FakeEvent(
+            "g1", "u1", [Plain(f"第 {i} 行：把一段很长的内容逐行粘贴进群里")]
+        )
+        ctx = make_ctx(event, now + i * 0.1)
+        start = time.perf_counter()
+        result = await step.handle(ctx)
+        # 与流水线一致：首条消息唤醒后开窗，之后每次合并都是唤醒
+        await step.activate_window(ctx)
+        costs.append(time.perf_counter() - start)
+        assert i == 0 or result.wake, "消息未被合并"
+    assert ctx is not None
+    assert ctx.event.message_str.count("\n") == merges - 1, "合并结果不完整"
+    reset_state()
+    tail = costs[-10:]
+    return sum(costs) / len(costs) * 1e6, sum(tail) / len(tail) * 1e6
+
+
+async def run(registrations: int, keys: int, repeat: int, merges: int) -> None:
+    best = 0.0
+    for _ in range(repeat):
+        best = max(best, await bench_register(registrations, keys, window=30))
+    print(
+        f"register: {registrations} 次登记 / {keys} 个会话，"
+        f"{best:,.0f} 次/秒（{1e6 / best:.2f} us/次，取 {repeat} 轮最优）"
+    )
+    lag_ms, peak = await bench_expire(keys, window=0.2)
+    print(
+        f"expire:   {keys} 个请求同时过期，清理延迟 {lag_ms:.1f} ms，任务数峰值 {peak}"
+    )
+    mean_us, tail_us = min(
+        [await bench_merge(merges) for _ in range(repeat)], key=lambda r: r[0]
+    )
+    print(
+        f"merge:    连续合并 {merges} 条消息，平均 {mean_us:.1f} us/条，"
+        f"最后 10 条 {tail_us:.1f} us/条"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registrations", type=int, default=50_000)
+    parser.add_argument("--keys", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--merges", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.registrations, args.keys, args.repeat, args.merges))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+基准测试用的本地替身：不连接任何平台，直接构造流水线需要的事件与上下文
+
+- FakeEvent 只实现流水线各步骤实际用到的 AstrMessageEvent 接口
+- 消息组件使用 AstrBot 自带的 Plain / At / Reply / Image，保证 isinstance 判定与线上一致
+- 配置取自 _conf_schema.json 的默认值，可按需覆盖
+"""
+
+from __future__ import annotations
+
+import json
+from copy import deepcopy
+from pathlib import Path
+from typing import Any
+
+from astrbot.core.message.components import BaseMessageComponent, Plain
+
+from core.config import PluginConfig
+from core.expiry import SilenceIndex
+from core.locks import KeyedLock
+from core.model import StateManager, WakeContext
+
+_SCHEMA = Path(__file__).resolve().parent.parent / "_conf_schema.json"
+
+BOT_ID = "10000"
+
+
+class FakeMessageObj:
+    def __init__(self, chain: list[BaseMessageComponent], message_str: str):
+        self.message = chain
+        self.message_str = message_str
+
+
+class FakeEvent:
+    """AstrMessageEvent 的最小替身"""
+
+    def __init__(
+        self,
+        gid: str,
+        uid: str,
+        chain: list[BaseMessageComponent],
+        *,
+        bid: str = BOT_ID,
+        is_admin: bool = False,
+        umo: str | None = None,
+    ):
+        message_str = "".join(seg.text for seg in chain if isinstance(seg, Plain))
+        self.unified_msg_origin = umo or f"fake:GroupMessage:{gid}"
+        self.message_obj = FakeMessageObj(chain, message_str)
+        self.message_str = message_str
+        self.is_at_or_wake_command = False
+        self._gid = gid
+        self._uid = uid
+        self._bid = bid
+        self._admin = is_admin
+        self._stopped = False
+        self._extras: dict[str, Any] = {}
+
+    def get_group_id(self) -> str:
+        return self._gid
+
+    def get_sender_id(self) -> str:
+        return self._uid
+
+    def get_self_id(self) -> str:
+        return self._bid
+
+    def get_messages(self) -> list[BaseMessageComponent]:
+        return self.message_obj.message
+
+    def is_admin(self) -> bool:
+        return self._admin
+
+    def stop_event(self) -> None:
+        self._stopped = True
+
+    def is_stopped(self) -> bool:
+        return self._stopped
+
+    def set_extra(self, key: str, value: Any) -> None:
+        self._extras[key] = value
+
+    def get_result(self) -> None:
+        return None
+
+
+class FakeContext:
+    """AstrBot Context 的最小替身，只提供全局配置"""
+
+    def __init__(self, wake_prefix: list[str] | None = None):
+        self._config = {"wake_prefix": wake_prefix or ["/"], "admins_id": []}
+
+    def get_config(self) -> dict[str, Any]:
+        return self._config
+
+
+def default_config() -> dict[str, Any]:
+    """按 _conf_schema.json 的默认值构造插件配置"""
+
+    def walk(items: dict[str, Any]) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for key, spec in items.items():
+            if spec.get("type") == "object":
+                out[key] = walk(spec["items"])
+            else:
+                out[key] = deepcopy(spec.get("default"))
+        return out
+
+    with open(_SCHEMA, encoding="utf-8") as f:
+        return walk(json.load(f))
+
+
+def make_config(overrides: dict[str, dict[str, Any]] | None = None) -> PluginConfig:
+    """
+    :param overrides: 按配置节覆盖默认值，如 {"wake": {"prob": 0}}
+    """
+    data = default_config()
+    for section, values in (overrides or {}).items():
+        data[section].update(values)
+    return PluginConfig(data, FakeContext())  # type: ignore[arg-type]
+
+
+def make_ctx(
+    event: FakeEvent, now: float, commands: frozenset[str] = frozenset()
+) -> WakeContext:
+    """与 WakePlugin.on_group_msg 相同的方式构造唤醒上下文"""
+    chain = event.get_messages()
+    plain = " ".join(seg.text for seg in chain if isinstance(seg, Plain)).strip()
+    first_arg = event.message_str.split(" ", 1)[0]
+    gid, uid = event.get_group_id(), event.get_sender_id()
+    group = StateManager.get_group(gid, now) if gid else None
+    return WakeContext(
+        event=event,  # type: ignore[arg-type]
+        chain=chain,
+        plain=plain,
+        cmd=first_arg if first_arg in commands else None,
+        is_admin=event.is_admin(),
+        umo=event.unified_msg_origin,
+        gid=gid,
+        uid=uid,
+        bid=event.get_self_id(),
+        group=group,
+        member=StateManager.get_member(group, uid, now) if group else None,
+        now=now,
+    )
+
+
+def reset_state() -> None:
+    """清空 StateManager 的全局状态，停止防抖过期循环"""
+    StateManager.stop_pending_expiry()
+    StateManager._groups.clear()
+    StateManager._last_active.clear()
+    StateManager.take_dirty()
+    StateManager._silences = SilenceIndex()
+    StateManager._pending_locks = KeyedLock()
+    StateManager.member_locks = KeyedLock()
+    StateManager.evictions = 0
+    StateManager.member_evictions = 0
+    StateManager.pending_expired = 0
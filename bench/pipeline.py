@@ -0,0 +1,321 @@
+"""
+流水线基准：各步骤、NLP 组件与完整 Pipeline.run 的吞吐与延迟分位
+
+离线运行，事件与上下文由 bench.fixtures 构造，语料由 bench.corpus 合成。
+
+用法（插件根目录下）：
+    python -m bench.pipeline [--messages 3000] [--repeat 3]
+    python -m bench.pipeline --save                   # 把结果写入基线文件
+    python -m bench.pipeline --compare [--tolerance 0.25]
+                                                      # 与基线比较，有回退时退出码为 1
+
+基线记录的是绝对吞吐与延迟，只在录制它的机器上有意义：换机器、换 Python 版本
+或代码有较大改动后，先用 --save 在本机重新录制，再用 --compare 检查后续改动。
+基线同时记录 --messages / --repeat，参数不一致时拒绝比较（退出码 2）。
+微秒级步骤的 p99 受调度抖动影响很大，增量不足 P99_FLOOR_US 时不算回退。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import random
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from astrbot.core.message.components import Plain
+
+from core.analysis import MessageAnalysis, warmup
+from core.interest import Interest
+from core.model import StateManager, WakeContext
+from core.pipeline import Pipeline
+from core.sentiment import sentiment
+from core.similarity import Similarity
+from core.step import BaseStep, DebounceStep, SilenceStep
+
+from .corpus import BOT_REPLIES, Sample, generate
+from .fixtures import FakeEvent, make_config, make_ctx, reset_state
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+P99_FLOOR_US = 50.0
+"""p99 的绝对增量低于此值时视为调度抖动，不算回退"""
+
+# 相邻两条消息的模拟时间间隔（秒），避免所有群都进入刷屏降级
+_TICK = 0.5
+
+
+@dataclass(slots=True)
+class Result:
+    ops: float
+    """每秒处理条数"""
+    p50_us: float
+    p99_us: float
+
+
+def _summarize(samples_ns: list[int]) -> Result:
+    samples_ns.sort()
+    n = len(samples_ns)
+    total = sum(samples_ns) or 1
+    return Result(
+        ops=n / (total / 1e9),
+        p50_us=samples_ns[n // 2] / 1e3,
+        p99_us=samples_ns[min(n - 1, int(n * 0.99))] / 1e3,
+    )
+
+
+def _new_pipeline() -> Pipeline:
+    reset_state()
+    random.seed(0)
+    return Pipeline(make_config())
+
+
+def _seed_bot_msgs(pipeline: Pipeline, samples: list[Sample]) -> None:
+    for gid in {s.gid for s in samples}:
+        group = StateManager.get_group(gid)
+        for text in BOT_REPLIES:
+            pipeline.record_bot_msg(group, text)
+
+
+async def _drive(
+    samples: list[Sample],
+    pipeline: Pipeline,
+    call: Callable[[WakeContext], object],
+    after: Callable[[WakeContext], Awaitable[object]] | None = None,
+    prepare: Callable[[WakeContext], None] | None = None,
+) -> list[int]:
+    """逐条构造上下文并计时 call（上下文构造与 after 不计时）"""
+    _seed_bot_msgs(pipeline, samples)
+    now = time.time()
+    timings: list[int] = []
+    clock = time.perf_counter_ns
+    for s in samples:
+        ctx = make_ctx(FakeEvent(s.gid, s.uid, s.chain, is_admin=s.is_admin), now)
+        now += _TICK
+        if prepare:
+            prepare(ctx)
+        start = clock()
+        ret = call(ctx)
+        if inspect.isawaitable(ret):
+            await ret
+        timings.append(clock() - start)
+        if after:
+            await after(ctx)
+    reset_state()
+    return timings
+
+
+def _tokenize(analysis: MessageAnalysis) -> list[str]:
+    """触发分词（结果缓存在分析对象上）"""
+    return analysis.tokens
+
+
+def _mark_woken(ctx: WakeContext) -> None:
+    # 沉默检测只在唤醒后生效，这里视每条消息都已唤醒
+    ctx.event.is_at_or_wake_command = True
+
+
+async def bench_steps(samples: list[Sample]) -> dict[str, Result]:
+    results: dict[str, Result] = {}
+    for cls in Pipeline.STEP_REGISTRY:
+        pipeline = _new_pipeline()
+        step: BaseStep = next(s for s in pipeline._steps if isinstance(s, cls))
+        after = prepare = None
+        if isinstance(step, DebounceStep):
+            # 每条消息之后都开启防抖窗口，使后续消息走合并分支
+            after = step.activate_window
+        elif isinstance(step, SilenceStep):
+            prepare = _mark_woken
+        timings = await _drive(samples, pipeline, step.handle, after, prepare)
+        results[f"step.{step.name.value}"] = _summarize(timings)
+    return results
+
+
+async def bench_pipeline(samples: list[Sample]) -> dict[str, Result]:
+    pipeline = _new_pipeline()
+    timings = await _drive(samples, pipeline, pipeline.run)
+    results = {"pipeline.run": _summarize(timings)}
+
+    # 全程路径：不会被任何步骤拦截或唤醒的闲聊，六个步骤全部执行；
+    # 关闭 NLP 信号、固定少量活跃成员（步骤计划缓存命中），只衡量流水线自身的开销
+    reset_state()
+    no_nlp = {"similar": 1, "ask": 1, "bored": 1, "interest": 1, "prob": 0}
+    pipeline = Pipeline(make_config({"wake": no_nlp}))
+    chatter = [s for s in generate(len(samples), users=10) if s.kind == "chatter"]
+    timings = await _drive(chatter, pipeline, pipeline.run)
+    results["pipeline.full_path"] = _summarize(timings)
+    return results
+
+
+def bench_components(samples: list[Sample]) -> dict[str, Result]:
+    texts = [
+        " ".join(seg.text for seg in s.chain if isinstance(seg, Plain)).strip()
+        for s in samples
+    ]
+    texts = [t for t in texts if t]
+    cfg = make_config()
+    clock = time.perf_counter_ns
+    results: dict[str, Result] = {}
+
+    timings = []
+    for t in texts:
+        start = clock()
+        _tokenize(MessageAnalysis(t))
+        timings.append(clock() - start)
+    results["nlp.tokenize"] = _summarize(timings)
+
+    # 以下组件均使用已分词的分析结果，只计组件自身的开销
+    analyses = [MessageAnalysis(t) for t in texts]
+    for a in analyses:
+        _tokenize(a)
+
+    similarity = Similarity()
+    bot_msgs = [similarity.make_record(t) for t in BOT_REPLIES]
+    interest = Interest(cfg.wake._interest_words)
+    cases: dict[str, Callable[[MessageAnalysis], object]] = {
+        "nlp.similarity": lambda a: similarity.similarity("bench", a, bot_msgs),
+        "nlp.interest": interest.calc_interest,
+        "nlp.sentiment": sentiment.score_all,
+    }
+    for name, fn in cases.items():
+        timings = []
+        for a in analyses:
+            start = clock()
+            fn(a)
+            timings.append(clock() - start)
+        results[name] = _summarize(timings)
+    return results
+
+
+async def run_once(samples: list[Sample]) -> dict[str, Result]:
+    results = bench_components(samples)
+    results.update(await bench_steps(samples))
+    results.update(await bench_pipeline(samples))
+    return results
+
+
+async def run_all(n_messages: int, repeat: int) -> dict[str, Result]:
+    """重复 repeat 轮，每项取最好的一轮以压低噪声"""
+    thread = warmup()
+    if thread:
+        thread.join()
+    samples = generate(n_messages)
+    best: dict[str, Result] = {}
+    for _ in range(max(1, repeat)):
+        for name, r in (await run_once(samples)).items():
+            b = best.get(name)
+            best[name] = (
+                r
+                if b is None
+                else Result(
+                    max(b.ops, r.ops), min(b.p50_us, r.p50_us), min(b.p99_us, r.p99_us)
+                )
+            )
+    return best
+
+
+def _print(results: dict[str, Result]) -> None:
+    print(f"{'case':>16} {'ops/s':>10} {'p50(us)':>9} {'p99(us)':>9}")
+    for name, r in results.items():
+        print(f"{name:>16} {r.ops:>10.0f} {r.p50_us:>9.1f} {r.p99_us:>9.1f}")
+
+
+def _params(n_messages: int, repeat: int) -> dict[str, str | int]:
+    """影响结果可比性的运行参数"""
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "messages": n_messages,
+        "repeat": repeat,
+    }
+
+
+def _save(results: dict[str, Result], n_messages: int, repeat: int) -> None:
+    data = {
+        **_params(n_messages, repeat),
+        "results": {k: asdict(v) for k, v in results.items()},
+    }
+    BASELINE.write_text(
+        json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    print(f"基线已写入 {BASELINE}")
+
+
+def _load_baseline(n_messages: int, repeat: int) -> dict | None:
+    """读取基线；--messages / --repeat 与录制时不同则无法比较，返回 None"""
+    if not BASELINE.exists():
+        print(f"基线文件不存在：{BASELINE}，请先用 --save 录制")
+        return None
+    data = json.loads(BASELINE.read_text(encoding="utf-8"))
+    params = _params(n_messages, repeat)
+    for key in ("messages", "repeat"):
+        if data.get(key) != params[key]:
+            print(
+                f"本次 --{key} {params[key]} 与基线录制时的 {data.get(key)} 不同，"
+                "拒绝比较"
+            )
+            return None
+    for key in ("python", "machine"):
+        if data.get(key) != params[key]:
+            print(
+                f"注意：基线录制于 {key}={data.get(key)}，本机为 {params[key]}，"
+                "绝对数值可能不可比，建议在本机重新录制"
+            )
+    return data["results"]
+
+
+def _compare(results: dict[str, Result], base: dict, tolerance: float) -> bool:
+    """与基线比较：吞吐下降或 p99 上升超过 tolerance 视为回退"""
+    regressed = False
+    print(f"{'case':>16} {'ops/s':>10} {'Δops':>8} {'p99(us)':>9} {'Δp99':>8}")
+    for name, r in results.items():
+        b = base.get(name)
+        if b is None:
+            print(f"{name:>16} {r.ops:>10.0f} {'new':>8} {r.p99_us:>9.1f}")
+            continue
+        d_ops = r.ops / b["ops"] - 1
+        d_p99 = r.p99_us / b["p99_us"] - 1 if b["p99_us"] else 0.0
+        bad = d_ops < -tolerance or (
+            d_p99 > tolerance and r.p99_us - b["p99_us"] > P99_FLOOR_US
+        )
+        regressed |= bad
+        print(
+            f"{name:>16} {r.ops:>10.0f} {d_ops:>+8.1%} {r.p99_us:>9.1f} "
+            f"{d_p99:>+8.1%}{'  <-- 回退' if bad else ''}"
+        )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3, help="重复轮数，取最好成绩")
+    parser.add_argument("--save", action="store_true", help="写入基线文件")
+    parser.add_argument("--compare", action="store_true", help="与基线比较")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="允许的相对退化幅度"
+    )
+    args = parser.parse_args()
+
+    base = None
+    if args.compare:
+        base = _load_baseline(args.messages, args.repeat)
+        if base is None:
+            sys.exit(2)
+    results = asyncio.run(run_all(args.messages, args.repeat))
+    if base is not None:
+        if _compare(results, base, args.tolerance):
+            sys.exit(1)
+    else:
+        _print(results)
+    if args.save:
+        _save(results, args.messages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
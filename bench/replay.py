@@ -0,0 +1,294 @@
+"""
+回放录制的消息轨迹（core/recorder.py 写出的 gzip JSONL）
+
+- 按录制时间戳推进虚拟时钟（ctx.now），不等待真实时间，尽可能快地回放
+- 逐行读取、逐行写出判定，内存占用与轨迹长度无关
+- 每条消息输出一行判定：
+  {"i", "ts", "g", "u", "woken", "stopped", "match", "steps": [[步骤, 结果, 原因码, 耗时us], ...]}
+  match 表示与录制时线上的判定（woken / stopped）是否一致
+- 结束时打印吞吐、一致率与各步骤耗时分位
+
+轨迹中的 ID 已哈希，配置里的白名单 / 黑名单等 ID 列表在回放时不会命中。
+
+用法（插件根目录下）：
+    python -m bench.replay TRACE.jsonl.gz [--out decisions.jsonl.gz] [--limit N]
+                                          [--config overrides.json|JSON]
+    python -m bench.replay --synthesize 1000000 TRACE.jsonl.gz
+                                          # 用合成语料生成一份轨迹
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from astrbot.core.message.components import (
+    At,
+    BaseMessageComponent,
+    Image,
+    Plain,
+    Reply,
+)
+
+from core.analysis import warmup
+from core.metrics import Histogram, outcome_of
+from core.model import StateManager, StepResult, WakeContext
+from core.pipeline import Pipeline
+from core.step import BaseStep
+
+from .corpus import BOT_REPLIES, stream
+from .fixtures import BOT_ID, FakeEvent, make_config, make_ctx, reset_state
+
+# 每回放多少条记录让出一次事件循环，让防抖过期等后台任务得以执行和回收
+_YIELD_EVERY = 64
+
+
+def _open(path: str | Path, mode: str) -> IO[str]:
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")  # type: ignore[return-value]
+    return open(path, mode, encoding="utf-8")
+
+
+def read_trace(path: str | Path) -> Iterator[dict[str, Any]]:
+    with _open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_chain(segments: list[dict[str, Any]]) -> list[BaseMessageComponent]:
+    """按录制的摘要还原消息链（流水线不关心的组件类型直接略过）"""
+    chain: list[BaseMessageComponent] = []
+    for seg in segments:
+        t = seg["t"]
+        if t == "plain":
+            chain.append(Plain(seg["text"]))
+        elif t == "at":
+            chain.append(At(qq=seg["qq"]))
+        elif t == "reply":
+            chain.append(Reply(id="0", sender_id=seg["sender"]))
+        elif t == "image":
+            chain.append(Image(file="replay.gif" if seg["gif"] else "replay.jpg"))
+    return chain
+
+
+class Replayer:
+    def __init__(self, pipeline: Pipeline):
+        self.pipeline = pipeline
+        self.steps: dict[str, Histogram] = defaultdict(Histogram)
+        self.messages = 0
+        self.replies = 0
+        self.woken = 0
+        self.matched = 0
+        self._current: list[list[Any]] = []
+        pipeline.observers.append(self._observe)
+
+    def _observe(
+        self, ctx: WakeContext, step: BaseStep, result: StepResult, elapsed: float
+    ) -> None:
+        name = step.name.value
+        self.steps[name].observe(elapsed)
+        self._current.append(
+            [name, outcome_of(result), result.reason or "", round(elapsed * 1e6, 1)]
+        )
+
+    async def feed(self, rec: dict[str, Any]) -> dict[str, Any] | None:
+        """回放一条记录，消息返回判定，bot 回复返回 None"""
+        if rec["k"] == "reply":
+            await self._reply(rec)
+            return None
+
+        event = FakeEvent(
+            rec["g"],
+            rec["u"],
+            build_chain(rec["chain"]),
+            bid=rec["b"],
+            is_admin=rec["admin"],
+            umo=rec["umo"],
+        )
+        ctx = make_ctx(event, rec["ts"])
+        ctx.cmd = rec["cmd"]
+        ctx.plain = rec["plain"]
+        self._current = []
+        await self.pipeline.run(ctx)
+
+        woken = bool(event.is_at_or_wake_command)
+        stopped = event.is_stopped()
+        match = woken == rec["woken"] and stopped == rec["stopped"]
+        self.messages += 1
+        self.woken += woken
+        self.matched += match
+        return {
+            "i": self.messages,
+            "ts": rec["ts"],
+            "g": rec["g"],
+            "u": rec["u"],
+            "woken": woken,
+            "stopped": stopped,
+            "match": match,
+            "steps": self._current,
+        }
+
+    async def _reply(self, rec: dict[str, Any]) -> None:
+        """与 WakePlugin.on_decorating_result 相同的状态更新"""
+        self.replies += 1
+        gid, uid = rec["g"], rec["u"]
+        if uid:
+            await StateManager.clear_pending_request(
+                StateManager.get_pending_key(rec["umo"], uid)
+            )
+        if not gid or not uid:
+            return
+        group = StateManager.get_group(gid, rec["ts"])
+        self.pipeline.record_bot_msg(group, rec["text"])
+        member = group.members.get(uid)
+        if member:
+            member.last_reply = rec["ts"]
+
+    def report(self, elapsed: float) -> str:
+        n = self.messages or 1
+        lines = [
+            (
+                f"消息 {self.messages} 条，bot 回复 {self.replies} 条，"
+                f"耗时 {elapsed:.2f}s（{self.messages / (elapsed or 1):.0f} 条/秒）"
+            ),
+            (
+                f"唤醒 {self.woken} 条（{self.woken / n:.1%}），"
+                f"与线上判定一致 {self.matched / n:.2%}"
+            ),
+            f"{'step':>10} {'count':>9} {'mean(us)':>9} {'p50≤(us)':>9} {'p99≤(us)':>9}",
+        ]
+        for name, h in self.steps.items():
+            mean = h.sum / h.count if h.count else 0.0
+            lines.append(
+                f"{name:>10} {h.count:>9} {mean * 1e6:>9.1f} "
+                f"{h.quantile(0.5) * 1e6:>9g} {h.quantile(0.99) * 1e6:>9g}"
+            )
+        return "\n".join(lines)
+
+
+async def replay(
+    path: str | Path,
+    *,
+    out: IO[str] | None = None,
+    limit: int = 0,
+    overrides: dict[str, dict[str, Any]] | None = None,
+) -> Replayer:
+    # 与线上稳定运行时一致：分词器已就绪，相关性等信号可用
+    thread = warmup()
+    if thread:
+        thread.join()
+    reset_state()
+    random.seed(0)
+    replayer = Replayer(Pipeline(make_config(overrides)))
+    start = time.perf_counter()
+    for i, rec in enumerate(read_trace(path)):
+        if limit and replayer.messages >= limit:
+            break
+        decision = await replayer.feed(rec)
+        if decision is not None and out is not None:
+            out.write(json.dumps(decision, ensure_ascii=False) + "\n")
+        if i % _YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    print(replayer.report(time.perf_counter() - start), file=sys.stderr)
+    reset_state()
+    return replayer
+
+
+def synthesize(path: str | Path, n: int, seed: int = 42) -> None:
+    """用合成语料写一份轨迹：每秒约两条消息，被艾特后紧跟一条 bot 回复"""
+    rng = random.Random(seed)
+    now = time.time()
+    with _open(path, "wt") as f:
+        for s in stream(n, seed=seed):
+            now += rng.expovariate(2.0)
+            segments: list[dict[str, Any]] = []
+            for seg in s.chain:
+                if isinstance(seg, Plain):
+                    segments.append({"t": "plain", "text": seg.text})
+                elif isinstance(seg, At):
+                    segments.append({"t": "at", "qq": str(seg.qq)})
+                elif isinstance(seg, Reply):
+                    segments.append({"t": "reply", "sender": str(seg.sender_id)})
+                elif isinstance(seg, Image):
+                    gif = str(seg.file).endswith(".gif")
+                    segments.append({"t": "image", "gif": gif})
+            plain = " ".join(
+                seg["text"] for seg in segments if seg["t"] == "plain"
+            ).strip()
+            umo = f"fake:GroupMessage:{s.gid}"
+            rec = {
+                "k": "msg",
+                "ts": now,
+                "umo": umo,
+                "g": s.gid,
+                "u": s.uid,
+                "b": BOT_ID,
+                "admin": s.is_admin,
+                "cmd": None,
+                "plain": plain,
+                "chain": segments,
+                "woken": s.kind == "mention",
+                "stopped": False,
+            }
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            if s.kind == "mention":
+                reply = {
+                    "k": "reply",
+                    "ts": now + 1,
+                    "umo": umo,
+                    "g": s.gid,
+                    "u": s.uid,
+                    "text": rng.choice(BOT_REPLIES),
+                }
+                f.write(json.dumps(reply, ensure_ascii=False) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("trace", help="轨迹文件（.jsonl 或 .jsonl.gz）")
+    parser.add_argument("--out", help="判定输出文件，- 表示标准输出")
+    parser.add_argument("--limit", type=int, default=0, help="最多回放多少条消息")
+    parser.add_argument(
+        "--config",
+        help='配置覆盖：JSON 文件路径，或直接写 JSON，如 \'{"wake": {"prob": 0}}\'',
+    )
+    parser.add_argument(
+        "--synthesize", type=int, metavar="N", help="生成 N 条合成消息的轨迹后退出"
+    )
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize(args.trace, args.synthesize)
+        return
+
+    overrides = None
+    if args.config:
+        text = args.config
+        if not text.lstrip().startswith("{"):
+            text = Path(text).read_text(encoding="utf-8")
+        overrides = json.loads(text)
+    if args.out == "-":
+        asyncio.run(
+            replay(args.trace, out=sys.stdout, limit=args.limit, overrides=overrides)
+        )
+    elif args.out:
+        with _open(args.out, "wt") as out:
+            asyncio.run(
+                replay(args.trace, out=out, limit=args.limit, overrides=overrides)
+            )
+    else:
+        asyncio.run(replay(args.trace, limit=args.limit, overrides=overrides))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+情感打分一致性检查：融合单次扫描（Sentiment.score_all）vs 逐词表打分的旧实现
+
+参考实现照搬旧版 Sentiment：转小写、删除标点后分词，再对每个词表分别计算可信度。
+语料为基准测试消息流加上一批带标点、否定、反问的构造消息，逐条比较五个类别的分数，
+任一条不一致时打印差异并以非零状态退出。
+
+用法（插件根目录下）：
+    python -m bench.sentiment [--messages 3000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+import sys
+
+from astrbot.core.message.components import Plain
+
+from core.analysis import MessageAnalysis, warmup
+from core.sentiment import Sentiment, sentiment
+
+from .corpus import generate
+
+# 标点拆开的词、全角字符、否定与反问等容易让分词或打分出现偏差的写法
+_CASES = [
+    "你真是个傻。逼",
+    "傻，逼",
+    "闭嘴！别说了！！",
+    "你，是不是AI啊？",
+    "ＡＩ味好重",
+    "好无聊……有人吗",
+    "不是傻逼",
+    "难道你是傻逼吗？",
+    "我才不无聊呢",
+    "怎么可能闭嘴",
+    "这是什么？为什么？怎么办？",
+    "c++怎么学？",
+]
+
+
+def _reference_seg(text: str) -> list[str]:
+    """旧版 Sentiment._seg"""
+    import jieba
+
+    text = re.sub(r"[^\w\s\u4e00-\u9fa5]", "", text.lower())
+    return [w for w in jieba.lcut(text) if w.strip() and w not in Sentiment.STOP]
+
+
+def _reference_confidence(words: list[str], keyword_dict: dict) -> float:
+    """旧版 Sentiment._calculate_confidence"""
+    base_score = 0
+    matched_keywords = []
+    has_rhetorical = any(r_word in words for r_word in Sentiment.RHETORICAL_WORDS)
+    for i, word in enumerate(words):
+        if word in keyword_dict:
+            weight, intensity = keyword_dict[word]
+            has_negation = any(
+                neg_word in words[max(0, i - 3) : i]
+                for neg_word in Sentiment.NEGATION_WORDS
+            )
+            if has_negation:
+                weight *= 0.3
+                intensity *= 0.5
+            elif has_rhetorical:
+                weight *= 0.7
+                intensity *= 0.8
+            base_score += weight * intensity
+            matched_keywords.append(word)
+
+    context_score = 0
+    if matched_keywords:
+        density = len(matched_keywords) / len(words) if words else 0
+        context_score += min(1.0, density * 5) * 0.5
+        if len(matched_keywords) > 1:
+            context_score += min(1.0, (len(matched_keywords) - 1) * 0.4)
+
+    total_score = base_score + context_score
+    confidence = 1 / (1 + math.exp(-4 * (total_score - 1.5)))
+    return min(0.99, confidence)
+
+
+def _reference_scores(text: str) -> tuple[float, ...]:
+    words = _reference_seg(text)
+    lexicons = (
+        Sentiment.SHUT_WORDS,
+        Sentiment.INSULT_WORDS,
+        Sentiment.BORED_WORDS,
+        Sentiment.ASK_WORDS,
+        Sentiment.AI_WORDS,
+    )
+    return tuple(_reference_confidence(words, lexicon) for lexicon in lexicons)
+
+
+def run(n_messages: int) -> bool:
+    thread = warmup()
+    if thread:
+        thread.join()
+    texts = list(_CASES)
+    for s in generate(n_messages):
+        text = " ".join(seg.text for seg in s.chain if isinstance(seg, Plain))
+        if text.strip():
+            texts.append(text.strip())
+
+    mismatches = 0
+    for text in texts:
+        expected = _reference_scores(text)
+        scores = sentiment.score_all(MessageAnalysis(text))
+        got = tuple(getattr(scores, c) for c in Sentiment.CATEGORIES)
+        if any(not math.isclose(a, b, abs_tol=1e-12) for a, b in zip(expected, got)):
+            mismatches += 1
+            print(f"不一致：{text!r}\n  旧实现 {expected}\n  单次扫描 {got}")
+
+    print(f"{len(texts)} 条消息，不一致 {mismatches} 条")
+    return mismatches == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=3000)
+    args = parser.parse_args()
+    ok = run(args.messages)
+    print("通过" if ok else "未通过")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+多进程共享状态检查：若干进程通过同一个本地 SQLite 文件（WAL）共享沉默、唤醒与 bot 消息
+
+每个进程在同一个群里沉默一批自己的成员、记录唤醒时间并发出一条 bot 消息；
+另有一批所有进程共同写入的成员：各由一个进程沉默，稍后所有进程都记录唤醒时间，
+整群闭嘴也由每个进程各写一个不同的时间。随后各进程等待，直到本地状态包含
+其他所有进程的写入，且共同写入的键收敛到各进程写入值中的较晚者。
+全部进程退出后，再由一个进程补写一批 bot 消息、另一个后来加入的进程启动，
+检查其首次同步只应用了每群最新的 BOT_MSG_KEEP 条，且顺序与写入一致。
+
+这是手动运行的验证脚本（仓库没有测试套件），不会被自动收集；
+输出每个进程的收敛耗时与同步统计，任一检查失败时以非零状态退出，可直接放进 CI。
+
+用法（插件根目录下）：
+    python -m bench.shared_state [--procs 4] [--members 500] [--shared 100]
+                                 [--interval 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from bench.fixtures import make_config
+from core.model import GroupState, StateManager
+from core.sqlite_backend import SqliteBackend
+
+GID = "shared"
+
+
+def _uid(proc: int, j: int) -> str:
+    return f"p{proc}-u{j}"
+
+
+def _shared_uid(j: int) -> str:
+    return f"shared-u{j}"
+
+
+async def _work(
+    idx: int,
+    procs: int,
+    path: str,
+    members: int,
+    shared: int,
+    base: float,
+    interval: float,
+    timeout: float,
+) -> dict[str, Any]:
+    cfg = make_config(
+        {
+            "backend": {"kind": "sqlite", "sync_interval": interval},
+            "memory": {"member_capacity": 0},
+        }
+    )
+    StateManager.configure(cfg.memory, cfg.wake)
+    seen_msgs: set[str] = set()
+
+    def on_bot_msg(group: GroupState, text: str) -> None:
+        seen_msgs.add(text)
+
+    backend = SqliteBackend(Path(path), cfg.backend, on_bot_msg)
+    StateManager.use_backend(backend)
+    await backend.start()
+
+    now = time.time()
+    group = StateManager.get_group(GID, now)
+    for j in range(members):
+        member = StateManager.get_member(group, _uid(idx, j), now)
+        StateManager.silence_member(group, member, now + 3600)
+        StateManager.mark_wake(group, member, now)
+    StateManager.shutup_group(group, base + 600 + idx)
+    backend.publish_bot_msg(group, f"进程 {idx} 的消息", now)
+
+    # 共同写入的键：先由各自的进程沉默，等其提交后所有进程再写唤醒时间，
+    # 使最后写入者往往不是沉默值的来源
+    for j in range(idx, shared, procs):
+        member = StateManager.get_member(group, _shared_uid(j), now)
+        StateManager.silence_member(group, member, base + 3600 + j)
+    await asyncio.sleep(interval * 2)
+    for j in range(shared):
+        member = StateManager.get_member(group, _shared_uid(j), time.time())
+        StateManager.mark_wake(group, member, base + idx)
+
+    expected_msgs = {f"进程 {k} 的消息" for k in range(procs) if k != idx}
+    start = time.perf_counter()
+    converged = False
+    while time.perf_counter() - start < timeout:
+        await asyncio.sleep(interval / 4)
+        now = time.time()
+        # 其他进程的成员在本地首次出现时由镜像填充，已存在时由同步合并
+        ok = group.shutup_until == base + 600 + procs - 1 and expected_msgs <= seen_msgs
+        for j in range(shared):
+            if not ok:
+                break
+            member = StateManager.get_member(group, _shared_uid(j), now)
+            ok = (
+                member.silence_until == base + 3600 + j
+                and member.last_wake == base + procs - 1
+            )
+        for k in range(procs):
+            if not ok:
+                break
+            if k == idx:
+                continue
+            for j in range(members):
+                member = StateManager.get_member(group, _uid(k, j), now)
+                if member.silence_until <= now or not member.last_wake:
+                    ok = False
+                    break
+        if ok:
+            converged = True
+            break
+    elapsed = time.perf_counter() - start
+    await backend.close()
+    return {
+        "proc": idx,
+        "converged": converged,
+        "seconds": elapsed,
+        "silenced": len(StateManager.silenced(GID, time.time())),
+        **backend.stats(),
+    }
+
+
+async def _late_join(path: str) -> tuple[list[str], list[str]]:
+    """
+    补写一批 bot 消息后启动一个后来加入的后端
+    :return: (首次同步应用的 bot 消息, 应当应用的最新几条)
+    """
+    cfg = make_config({"backend": {"kind": "sqlite"}})
+    StateManager.configure(cfg.memory, cfg.wake)
+    keep = SqliteBackend.BOT_MSG_KEEP
+    sent = [f"补写的第 {k} 条消息" for k in range(keep * 2)]
+    writer = SqliteBackend(Path(path), cfg.backend, lambda group, text: None)
+    group = StateManager.get_group(GID, time.time())
+    for text in sent:
+        writer.publish_bot_msg(group, text, time.time())
+    await writer.close()
+
+    applied: list[str] = []
+    reader = SqliteBackend(
+        Path(path), cfg.backend, lambda group, text: applied.append(text)
+    )
+    await reader.start()
+    await reader.close()
+    return applied, sent[-keep:]
+
+
+def _worker(
+    idx: int,
+    procs: int,
+    path: str,
+    members: int,
+    shared: int,
+    base: float,
+    interval: float,
+    timeout: float,
+    barrier: Any,
+    results: Any,
+) -> None:
+    barrier.wait()
+    results.put(
+        asyncio.run(_work(idx, procs, path, members, shared, base, interval, timeout))
+    )
+
+
+def run(procs: int, members: int, shared: int, interval: float, timeout: float) -> bool:
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "shared_state.db")
+        barrier = ctx.Barrier(procs)
+        results = ctx.Queue()
+        base = float(int(time.time()))
+        workers = [
+            ctx.Process(
+                target=_worker,
+                args=(
+                    i,
+                    procs,
+                    path,
+                    members,
+                    shared,
+                    base,
+                    interval,
+                    timeout,
+                    barrier,
+                    results,
+                ),
+            )
+            for i in range(procs)
+        ]
+        for w in workers:
+            w.start()
+        rows = [results.get() for _ in workers]
+        for w in workers:
+            w.join()
+        applied, newest = asyncio.run(_late_join(path))
+
+    rows.sort(key=lambda r: r["proc"])
+    print(
+        f"{procs} 个进程 × {members} 个成员 + {shared} 个共同写入的成员，"
+        f"同步间隔 {interval}s，"
+        f"每个进程应看到 {procs * members + shared} 个沉默成员 + 整群闭嘴"
+    )
+    print(
+        f"{'proc':>4} {'ok':>3} {'收敛(s)':>8} {'沉默数':>6} {'syncs':>6} "
+        f"{'written':>8} {'applied':>8} {'sync(ms)':>9}"
+    )
+    for r in rows:
+        print(
+            f"{r['proc']:>4} {'是' if r['converged'] else '否':>3} {r['seconds']:>8.2f} "
+            f"{r['silenced']:>6} {r['syncs']:>6} {r['rows_written']:>8} "
+            f"{r['rows_applied']:>8} {r['last_sync_ms']:>9.2f}"
+        )
+    late_ok = applied == newest
+    print(
+        f"后来加入的进程首次同步应用 {len(applied)} 条 bot 消息，"
+        f"应为最新的 {len(newest)} 条：{'一致' if late_ok else '不一致'}"
+    )
+    expected = procs * members + shared + 1
+    return late_ok and all(r["converged"] and r["silenced"] == expected for r in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--shared", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=20.0)
+    args = parser.parse_args()
+    ok = run(args.procs, args.members, args.shared, args.interval, args.timeout)
+    print("通过" if ok else "未通过")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
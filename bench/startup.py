@@ -0,0 +1,107 @@
+"""
+启动耗时基准：NLP 模块导入、jieba 词典预热、预热期间事件循环卡顿
+
+每项测量都在独立子进程中进行，避免模块缓存互相影响。
+
+用法（插件根目录下）：
+    python -m bench.startup [--runs 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# 导入全部 NLP 模块（Similarity / Interest / Sentiment），jieba 不应被导入
+# core.model 依赖 AstrBot 框架本身，先行导入以排除框架的导入耗时
+_IMPORT = """
+import json, sys, time
+import core.model
+start = time.perf_counter()
+import core.interest, core.sentiment, core.similarity
+print(json.dumps({
+    "import_s": time.perf_counter() - start,
+    "jieba_loaded": "jieba" in sys.modules,
+}))
+"""
+
+# 冷启动后首条消息同步分词：旧行为下事件循环被阻塞的时长
+_COLD = """
+import json, time
+from core.analysis import MessageAnalysis
+start = time.perf_counter()
+MessageAnalysis("今天一起打排位吗").tokens
+print(json.dumps({"cold_first_msg_s": time.perf_counter() - start}))
+"""
+
+# 后台预热期间事件循环的最大卡顿，以及预热总耗时
+_WARM = """
+import asyncio, json, time
+from core.analysis import MessageAnalysis, nlp_ready, warmup
+
+async def main():
+    start = time.perf_counter()
+    thread = warmup()
+    worst = 0.0
+    while not nlp_ready():
+        t = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - t - 0.001)
+    thread.join()
+    ready = time.perf_counter() - start
+    t = time.perf_counter()
+    MessageAnalysis("今天一起打排位吗").tokens
+    return {
+        "warmup_s": ready,
+        "loop_max_lag_s": worst,
+        "warm_first_msg_s": time.perf_counter() - t,
+    }
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+
+def _run(code: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(runs: int) -> None:
+    samples: dict[str, list[float]] = {}
+    jieba_loaded = False
+    for _ in range(runs):
+        for code in (_IMPORT, _COLD, _WARM):
+            for key, value in _run(code).items():
+                if key == "jieba_loaded":
+                    jieba_loaded |= value
+                else:
+                    samples.setdefault(key, []).append(value)
+
+    print(f"{'metric':>18} {'min(ms)':>9} {'max(ms)':>9}")
+    for key, values in samples.items():
+        print(f"{key:>18} {min(values) * 1e3:9.1f} {max(values) * 1e3:9.1f}")
+    print(f"导入 NLP 模块时加载了 jieba: {jieba_loaded}")
+    if jieba_loaded:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    run(args.runs)
+
+
+if __name__ == "__main__":
+    main()
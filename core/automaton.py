@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    - 构建一次，单次扫描文本即可找出所有命中的关键词
+    - 匹配耗时只与文本长度（及命中数）有关，与词表大小无关
+    """
+
+    __slots__ = ("_fail", "_goto", "_out", "_words")
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._words: list[str] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        self._build(words)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __bool__(self) -> bool:
+        return bool(self._words)
+
+    @property
+    def words(self) -> list[str]:
+        """已编译的关键词（去重、去空后，保持原顺序）"""
+        return self._words
+
+    # ---------------------------------------------------------
+    # 构建
+    # ---------------------------------------------------------
+    def _build(self, words: Iterable[str]) -> None:
+        goto, out = self._goto, self._out
+        seen: set[str] = set()
+        for word in words:
+            if not word or word in seen:
+                continue
+            seen.add(word)
+            idx = len(self._words)
+            self._words.append(word)
+
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = (*out[state], idx)
+
+        # BFS 计算失配指针，并把失配链上的输出合并到当前节点
+        fail = self._fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+    # ---------------------------------------------------------
+    # 匹配
+    # ---------------------------------------------------------
+    def iter_matches(self, text: str) -> Iterator[tuple[int, str]]:
+        """
+        逐个产出命中结果
+
+        :param text: 待匹配文本
+        :return: (起始位置, 关键词)，按结束位置先后产出
+        """
+        goto, fail, out, words = self._goto, self._fail, self._out, self._words
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                word = words[idx]
+                yield i - len(word) + 1, word
+
+    def search(self, text: str) -> str | None:
+        """返回文本中最先出现（结束位置最靠前）的关键词，未命中返回 None"""
+        if not self._words or not text:
+            return None
+        for _, word in self.iter_matches(text):
+            return word
+        return None
+
+    def find_all(self, text: str) -> list[tuple[int, str]]:
+        """返回文本中全部命中的 (起始位置, 关键词)"""
+        if not self._words or not text:
+            return []
+        return list(self.iter_matches(text))
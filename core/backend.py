@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .model import GroupState, MemberState
+
+
+class StateBackend(ABC):
+    """
+    StateManager 背后的状态后端
+
+    - 进程内的 GroupState / MemberState 始终是流水线直接读取的缓存，步骤不感知后端
+    - 本进程对共享字段（群闭嘴、成员沉默、上次唤醒、bot 消息）的写入经 publish_* 交给后端
+    - 新建群 / 成员状态时经 load_* 用后端已知的共享状态填充
+    - 以上方法都在事件循环上同步调用，不允许阻塞；I/O 由后端自己的后台任务完成
+    """
+
+    name: str
+
+    async def start(self) -> None: ...
+    async def close(self) -> None: ...
+
+    @abstractmethod
+    def load_group(self, group: GroupState) -> None:
+        """新建群状态时调用"""
+
+    @abstractmethod
+    def load_member(self, group: GroupState, member: MemberState) -> None:
+        """新建成员状态时调用"""
+
+    @abstractmethod
+    def publish_group(self, group: GroupState) -> None:
+        """群闭嘴时间变化后调用"""
+
+    @abstractmethod
+    def publish_member(self, group: GroupState, member: MemberState) -> None:
+        """成员沉默或唤醒时间变化后调用"""
+
+    @abstractmethod
+    def publish_bot_msg(self, group: GroupState, text: str, now: float) -> None:
+        """bot 在群内发出消息后调用"""
+
+    def stats(self) -> dict[str, int | float]:
+        return {}
+
+
+class MemoryBackend(StateBackend):
+    """默认后端：单进程，本地对象就是全部状态，无需任何同步"""
+
+    name = "memory"
+
+    def load_group(self, group: GroupState) -> None:
+        pass
+
+    def load_member(self, group: GroupState, member: MemberState) -> None:
+        pass
+
+    def publish_group(self, group: GroupState) -> None:
+        pass
+
+    def publish_member(self, group: GroupState, member: MemberState) -> None:
+        pass
+
+    def publish_bot_msg(self, group: GroupState, text: str, now: float) -> None:
+        pass
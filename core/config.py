@@ -10,7 +10,12 @@ from typing import Any, Union, get_args, get_origin, get_type_hints
 from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.star.context import Context
-from astrbot.core.utils.astrbot_path import get_astrbot_plugin_path
+from astrbot.core.utils.astrbot_path import (
+    get_astrbot_plugin_data_path,
+    get_astrbot_plugin_path,
+)
+
+from .automaton import AhoCorasick
 
 
 class ConfigNode:
@@ -29,14 +34,20 @@ class ConfigNode:
 
     @classmethod
     def _schema(cls) -> dict[str, type]:
-        return cls._SCHEMA_CACHE.setdefault(cls, get_type_hints(cls))
+        # 不用 setdefault：其参数会被立即求值，每次访问都会重新解析类型注解
+        schema = cls._SCHEMA_CACHE.get(cls)
+        if schema is None:
+            schema = cls._SCHEMA_CACHE[cls] = get_type_hints(cls)
+        return schema
 
     @classmethod
     def _fields(cls) -> set[str]:
-        return cls._FIELDS_CACHE.setdefault(
-            cls,
-            {k for k in cls._schema() if not k.startswith("_")},
-        )
+        fields = cls._FIELDS_CACHE.get(cls)
+        if fields is None:
+            fields = cls._FIELDS_CACHE[cls] = {
+                k for k in cls._schema() if not k.startswith("_")
+            }
+        return fields
 
     @staticmethod
     def _is_optional(tp: type) -> bool:
@@ -113,29 +124,64 @@ class PipelineConfig(ConfigNode):
 
     def __init__(self, data: MutableMapping[str, Any]):
         super().__init__(data)
-        self._steps = self._parse_steps(self.steps)
-        self._whitelist_steps = self._parse_steps(self.whitelist_steps)
-        self._blacklist_steps = self._parse_steps(self.blacklist_steps)
+        self._signature: tuple | None = None
+        self._version = 0
+        self._compile()
 
     @staticmethod
     def _parse_steps(steps: list[str]) -> set[str]:
         return {name.split("(", 1)[0].strip() for name in steps if name.strip()}
 
     @staticmethod
-    def _contains_target(targets: list[str], *values: str) -> bool:
+    def _contains_target(targets: set[str], *values: str) -> bool:
         return any(value and value in targets for value in values)
 
+    def _lists(self) -> tuple[list[str], ...]:
+        return (
+            self.steps,
+            self.whitelist,
+            self.whitelist_steps,
+            self.blacklist,
+            self.blacklist_steps,
+        )
+
+    def _compile(self) -> None:
+        """
+        把各列表编译为哈希集合
+        列表被替换或增删后（对象或长度变化）自动重新编译，并递增版本号
+        """
+        lists = self._lists()
+        signature = tuple((id(v), len(v)) for v in lists)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._version += 1
+        self._steps = self._parse_steps(self.steps)
+        self._whitelist = set(self.whitelist)
+        self._whitelist_steps = self._parse_steps(self.whitelist_steps)
+        self._blacklist = set(self.blacklist)
+        self._blacklist_steps = self._parse_steps(self.blacklist_steps)
+
+    @property
+    def version(self) -> int:
+        """编译版本号，配置变化后递增，用于失效基于本配置的缓存"""
+        self._compile()
+        return self._version
+
     def is_enabled_step(self, step_name: str) -> bool:
+        self._compile()
         return step_name in self._steps
 
     def in_whitelist(self, step_name: str, *values: str) -> bool:
+        self._compile()
         return step_name in self._whitelist_steps and self._contains_target(
-            self.whitelist, *values
+            self._whitelist, *values
         )
 
     def in_blacklist(self, step_name: str, *values: str) -> bool:
+        self._compile()
         return step_name in self._blacklist_steps and self._contains_target(
-            self.blacklist, *values
+            self._blacklist, *values
         )
 
 
@@ -145,6 +191,29 @@ class BlockConfig(ConfigNode):
     reread: bool
     keywords: list[str]
 
+    def __init__(self, data: MutableMapping[str, Any]):
+        super().__init__(data)
+        self._matcher: AhoCorasick | None = None
+        self._matcher_src: list[str] | None = None
+        self._matcher_len = 0
+
+    @property
+    def keyword_matcher(self) -> AhoCorasick:
+        """
+        屏蔽词自动机（惰性构建）
+        屏蔽词列表被替换或增删后自动重建
+        """
+        keywords = self.keywords or []
+        if (
+            self._matcher is None
+            or self._matcher_src is not keywords
+            or self._matcher_len != len(keywords)
+        ):
+            self._matcher = AhoCorasick(keywords)
+            self._matcher_src = keywords
+            self._matcher_len = len(keywords)
+        return self._matcher
+
 
 class CommandConfig(ConfigNode):
     builtin_cmds: list[str]
@@ -188,6 +257,56 @@ class DebounceConfig(ConfigNode):
     message_types: list[str]
 
 
+class MemoryConfig(ConfigNode):
+    similarity_max_groups: int
+    similarity_group_ttl: float
+    similarity_vocab_budget: int
+    state_max_groups: int
+    state_group_ttl: float
+    member_capacity: int
+
+
+class PerfConfig(ConfigNode):
+    offload_scoring: bool
+    scoring_workers: int
+    scoring_timeout: float
+    scoring_max_queue: int
+    signal_budget_ms: float
+    flood_enter_rate: float
+    flood_leave_rate: float
+
+
+class MonitorConfig(ConfigNode):
+    enabled: bool
+    textfile_path: str
+    textfile_interval: float
+
+
+class RecordConfig(ConfigNode):
+    enabled: bool
+    path: str
+    salt: str
+    max_queue: int
+
+
+class TraceConfig(ConfigNode):
+    sample_rate: float
+    targets: list[str]
+    capacity: int
+
+
+class PersistConfig(ConfigNode):
+    enabled: bool
+    interval: float
+
+
+class BackendConfig(ConfigNode):
+    kind: str
+    path: str
+    sync_interval: float
+    retention: float
+
+
 class PluginConfig(ConfigNode):
     global_blacklist: list[str]
     pipeline: PipelineConfig
@@ -197,6 +316,13 @@ class PluginConfig(ConfigNode):
     wake: WakeConfig
     debounce: DebounceConfig
     silence: SilenceConfig
+    memory: MemoryConfig
+    perf: PerfConfig
+    monitor: MonitorConfig
+    record: RecordConfig
+    trace: TraceConfig
+    persist: PersistConfig
+    backend: BackendConfig
 
     _plugin_name: str = "astrbot_plugin_wakepro"
 
@@ -206,10 +332,22 @@ class PluginConfig(ConfigNode):
         self.wake_prefix: list[str] = self.context.get_config().get("wake_prefix", [])
         self.admins_id: list[str] = context.get_config().get("admins_id", [])
         self.plugin_dir = Path(get_astrbot_plugin_path()) / self._plugin_name
+        self.data_dir = Path(get_astrbot_plugin_data_path()) / self._plugin_name
         self.block_words_file = self.plugin_dir / "block_words.json"
+        self._global_blacklist: set[str] = set()
+        self._global_blacklist_src: tuple[int, int] | None = None
         self._normalize_whitelist()
         self._normalize_block_words()
 
+    def in_global_blacklist(self, *values: str) -> bool:
+        """全局黑名单判定（哈希集合，列表被替换或增删后自动重建）"""
+        src = self.global_blacklist or []
+        key = (id(src), len(src))
+        if key != self._global_blacklist_src:
+            self._global_blacklist = set(src)
+            self._global_blacklist_src = key
+        return any(value in self._global_blacklist for value in values)
+
     def _normalize_whitelist(self):
         if not self.admins_id:
             return
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from .config import PerfConfig
+
+T = TypeVar("T")
+
+
+class ScoringExecutor:
+    """
+    NLP 评分执行器
+
+    - 关闭卸载时直接在事件循环上同步执行（与旧行为一致）
+    - 开启后提交到有界线程池，每次提交带截止时间；
+      超时或排队已满时抛出 asyncio.TimeoutError，由调用方按“不主动唤醒”处理
+      （Python 3.10 上它与内置 TimeoutError 不是同一个类，调用方须捕获前者）
+    - 超时任务若仍在排队则直接取消；已开始执行的不会被强行中断，
+      在后台执行完毕后丢弃结果
+    """
+
+    def __init__(self):
+        self.cfg: PerfConfig | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_size = 0
+        self.pending = 0
+        """当前排队 + 执行中的任务数"""
+        self.max_pending = 0
+        """排队深度峰值"""
+        self.submitted = 0
+        self.timeouts = 0
+        self.rejected = 0
+        """队列已满被直接拒绝的次数"""
+
+    def configure(self, cfg: PerfConfig) -> None:
+        """绑定配置节点，之后每次提交都读取最新配置"""
+        self.cfg = cfg
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cfg and self.cfg.offload_scoring)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        assert self.cfg is not None
+        size = max(1, self.cfg.scoring_workers)
+        if self._pool is None or self._pool_size != size:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix="wakepro-score"
+            )
+            self._pool_size = size
+        return self._pool
+
+    def _done(self, _fut: Any) -> None:
+        self.pending -= 1
+
+    def _release(self, loop: asyncio.AbstractEventLoop, fut: Any) -> None:
+        """线程池回调，切回事件循环线程再递减计数"""
+        try:
+            loop.call_soon_threadsafe(self._done, fut)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        执行纯 CPU 的评分函数
+        :raises asyncio.TimeoutError: 超过截止时间或排队已满
+        """
+        if not self.enabled:
+            return fn(*args)
+        assert self.cfg is not None
+
+        limit = self.cfg.scoring_max_queue
+        if limit > 0 and self.pending >= limit:
+            self.rejected += 1
+            raise asyncio.TimeoutError("评分队列已满")  # noqa: UP041
+
+        loop = asyncio.get_running_loop()
+        cfut = self._get_pool().submit(fn, *args)
+        self.submitted += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        # 以线程池任务真正结束（或排队中被取消）为准递减，超时后仍在执行的任务照常计入
+        cfut.add_done_callback(partial(self._release, loop))
+        fut = asyncio.wrap_future(cfut, loop=loop)
+
+        timeout = self.cfg.scoring_timeout
+        try:
+            return await asyncio.wait_for(fut, timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:  # noqa: UP041
+            self.timeouts += 1
+            raise
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_size = 0
+
+
+scoring = ScoringExecutor()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import heapq
+
+GROUP = ""
+"""表示整群闭嘴的成员键（用户 ID 不会为空）"""
+
+
+class SilenceIndex:
+    """
+    沉默到期索引
+
+    - 以到期时间为键的最小堆 + 按群分组的当前到期时间表
+    - 写入 O(log n)；同一对象重复沉默时旧堆项不删除，清扫时与当前到期时间比对后丢弃
+    - 清扫从堆顶批量弹出已到期项，只触及真正过期的记录
+    - 过期堆项超过有效项时整体重建，堆大小始终与有效沉默数同阶
+    """
+
+    __slots__ = ("_active", "_count", "_heap", "expired")
+
+    def __init__(self):
+        self._heap: list[tuple[float, str, str]] = []
+        """(到期时间, 群号, 用户 ID 或 GROUP)"""
+        self._active: dict[str, dict[str, float]] = {}
+        """群号 -> {用户 ID 或 GROUP: 到期时间}"""
+        self._count = 0
+        self.expired = 0
+        """累计清扫的到期沉默数"""
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, gid: str, uid: str, until: float) -> None:
+        """登记沉默（uid 为 GROUP 表示整群闭嘴），重复登记以最后一次为准"""
+        entries = self._active.get(gid)
+        if entries is None:
+            entries = self._active[gid] = {}
+        if uid not in entries:
+            self._count += 1
+        entries[uid] = until
+        heapq.heappush(self._heap, (until, gid, uid))
+        if len(self._heap) > 2 * self._count + 64:
+            self._compact()
+
+    def discard(self, gid: str, uid: str = GROUP) -> None:
+        """提前解除沉默，堆项留待清扫时丢弃"""
+        entries = self._active.get(gid)
+        if entries and entries.pop(uid, None) is not None:
+            self._count -= 1
+            if not entries:
+                del self._active[gid]
+
+    def drop_group(self, gid: str) -> None:
+        """群状态被淘汰时移除该群全部记录"""
+        entries = self._active.pop(gid, None)
+        if entries:
+            self._count -= len(entries)
+
+    def sweep(self, now: float) -> int:
+        """清扫所有已到期的沉默，返回本次清扫数"""
+        heap = self._heap
+        active = self._active
+        swept = 0
+        while heap and heap[0][0] <= now:
+            until, gid, uid = heapq.heappop(heap)
+            entries = active.get(gid)
+            # 已被重新沉默、提前解除或随群淘汰的过期堆项
+            if not entries or entries.get(uid) != until:
+                continue
+            del entries[uid]
+            if not entries:
+                del active[gid]
+            swept += 1
+        self._count -= swept
+        self.expired += swept
+        return swept
+
+    def _compact(self) -> None:
+        self._heap = [
+            (until, gid, uid)
+            for gid, entries in self._active.items()
+            for uid, until in entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def is_silenced(self, gid: str, now: float) -> bool:
+        """群或群内任一成员仍处于沉默期"""
+        entries = self._active.get(gid)
+        return bool(entries) and any(until > now for until in entries.values())
+
+    def silenced(self, gid: str, now: float) -> list[tuple[str, float]]:
+        """群内当前仍在沉默的 (用户 ID 或 GROUP, 到期时间)，按到期时间排序"""
+        entries = self._active.get(gid)
+        if not entries:
+            return []
+        return sorted(
+            ((uid, until) for uid, until in entries.items() if until > now),
+            key=lambda item: item[1],
+        )
+
+    def groups(self) -> list[str]:
+        return list(self._active)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "silenced": self._count,
+            "silence_heap": len(self._heap),
+            "silence_expired": self.expired,
+        }
@@ -1,34 +1,20 @@
 import re
-from functools import lru_cache
+import unicodedata
+from collections import Counter
 
-import jieba
+from .analysis import MessageAnalysis
+from .automaton import AhoCorasick
 
 
 class Interest:
-    def __init__(
-        self, interest_words, cache_size=2048, min_msg_len=3, noise_pattern=r"^[\W_]+$"
-    ):
+    def __init__(self, interest_words, min_msg_len=3, noise_pattern=r"^[\W_]+$"):
         """
         interest_words: list[list[str]]
         """
         self.topics = [list(t) for t in interest_words]
         self.min_msg_len = min_msg_len
         self.noise_re = re.compile(noise_pattern)
-        self._install_token_cache(cache_size)
-
-    # --------------------------------------
-    # Tokenizer + LRU Cache
-    # --------------------------------------
-    def _install_token_cache(self, size):
-        @lru_cache(maxsize=size)
-        def cached(msg: str):
-            msg = msg.lower()
-            return [t for t in jieba.lcut(msg) if t.strip()]
-
-        self._cached_tokenize = cached
-
-    def tokenize(self, msg: str):
-        return self._cached_tokenize(msg)
+        self._compile()
 
     # --------------------------------------
     # Noise filtering
@@ -52,43 +38,81 @@ class Interest:
         return False
 
     # --------------------------------------
-    # Interest Calculation（高精度）
+    # 编译兴趣词（构造时执行一次）
     # --------------------------------------
-    def calc_interest(self, msg: str) -> float:
+    def _compile(self) -> None:
         """
-        返回兴趣值 0~1
+        把话题词表编译为：
+        - 关键词 -> id 的哈希索引（分词整词命中）
+        - 全部关键词的 AC 自动机（子串命中及其首次位置）
+        - 字符 -> (关键词 id, 出现次数) 的倒排表（半命中计数）
+        - 每个话题的总权重
         """
-        if self._is_noise(msg):
-            return 0.0
-
-        tokens = self.tokenize(msg)
-        best = 0.0
-
-        for topic in self.topics:
-            score = self._score_topic(msg, tokens, topic)
-            best = max(best, score)
-
-        return min(1.0, best)
+        kw_ids: dict[str, int] = {}
+        kw_weights: list[float] = []
+        kw_topics: list[list[int]] = []
+        topic_totals: list[float] = []
+
+        for t, topic in enumerate(self.topics):
+            total = 0.0
+            for raw in topic:
+                kw = unicodedata.normalize("NFKC", raw).lower()
+                if not kw:
+                    continue
+                k = kw_ids.get(kw)
+                if k is None:
+                    k = kw_ids[kw] = len(kw_weights)
+                    kw_weights.append(self._keyword_weight(kw))
+                    kw_topics.append([])
+                # 同一话题内重复的关键词按原逻辑重复计分
+                kw_topics[k].append(t)
+                total += kw_weights[k]
+            topic_totals.append(total)
+
+        char_index: dict[str, list[tuple[int, int]]] = {}
+        for kw, k in kw_ids.items():
+            for c, n in Counter(kw).items():
+                char_index.setdefault(c, []).append((k, n))
+
+        self._kw_ids = kw_ids
+        self._kw_weights = kw_weights
+        self._kw_half = [len(kw) / 2 for kw in kw_ids]
+        self._kw_topics = kw_topics
+        self._topic_totals = topic_totals
+        self._char_index = char_index
+        self._matcher = AhoCorasick(kw_ids)
 
     # --------------------------------------
-    # Topic scoring（更智能的打分）
+    # Interest Calculation（高精度）
     # --------------------------------------
-    def _score_topic(self, msg: str, tokens, topic_keywords):
-        total_weight = 0.0
-        gained = 0.0
+    def calc_interest(self, analysis: MessageAnalysis) -> float:
+        """
+        返回兴趣值 0~1
+        """
+        if not self._kw_ids or self._is_noise(analysis.text):
+            return 0.0
 
-        for kw in topic_keywords:
-            w = self._keyword_weight(kw)
-            total_weight += w
+        # 标点交给 jieba 自行切分（与旧版一致，"c++" 等词不会被标点拆开）；
+        # 文本与关键词都按 NFKC 归一化并转小写，全角 / 大小写写法同样命中
+        tokens = analysis.derive("interest_tokens", lambda a: a.tokens_of(a.normalized))
+        strengths = self._match_strengths(analysis.normalized, tokens)
+        if not strengths:
+            return 0.0
 
-            gained += w * self._match_strength(kw, msg, tokens)
+        gained = [0.0] * len(self._topic_totals)
+        for k, strength in strengths.items():
+            w = self._kw_weights[k] * strength
+            for t in self._kw_topics[k]:
+                gained[t] += w
 
-        if total_weight == 0:
-            return 0.0
+        best = 0.0
+        for t, g in enumerate(gained):
+            if g:
+                # 非线性拉伸：强命中更突出 + 弱命中更弱化
+                # γ < 1 → 强化强关联
+                best = max(best, (g / self._topic_totals[t]) ** 0.8)
 
-        # 非线性拉伸：强命中更突出 + 弱命中更弱化
-        base = gained / total_weight
-        return base**0.8  # γ < 1 → 强化强关联
+        return min(1.0, best)
 
     # --------------------------------------
     # 关键词权重（长度越长权重越高）
@@ -107,21 +131,33 @@ class Interest:
     # --------------------------------------
     # 关键词命中强度（0~1）
     # --------------------------------------
-    def _match_strength(self, kw, msg, tokens):
-        # 完整命中（tokens）
-        if kw in tokens:
-            return 1.0
+    def _match_strengths(self, msg: str, tokens: list[str]) -> dict[int, float]:
+        """一次扫描得到所有命中关键词的强度：关键词 id -> 强度"""
+        kw_ids = self._kw_ids
+        strengths: dict[int, float] = {}
 
-        # 原文命中（子串）
-        pos = msg.find(kw)
-        if pos != -1:
-            # 位置权重：句首更强，越后越弱
-            pos_factor = max(0.5, 1.0 - pos / max(1, len(msg)))
-            return 0.7 * pos_factor
+        # 完整命中（tokens）
+        for tok in tokens:
+            k = kw_ids.get(tok)
+            if k is not None:
+                strengths[k] = 1.0
+
+        # 原文命中（子串），按结束位置产出，同一关键词首次产出即首次出现位置
+        length = max(1, len(msg))
+        for pos, kw in self._matcher.iter_matches(msg):
+            k = kw_ids[kw]
+            if k not in strengths:
+                # 位置权重：句首更强，越后越弱
+                strengths[k] = 0.7 * max(0.5, 1.0 - pos / length)
 
         # 半命中（关键词部分被切开，例如 "排" + "位"）
-        chars_hit = sum(1 for c in kw if c in msg)
-        if chars_hit >= len(kw) / 2:
-            return 0.35
-
-        return 0.0
+        chars_hit: dict[int, int] = {}
+        for c in set(msg):
+            for k, n in self._char_index.get(c, ()):
+                if k not in strengths:
+                    chars_hit[k] = chars_hit.get(k, 0) + n
+        for k, hit in chars_hit.items():
+            if hit >= self._kw_half[k]:
+                strengths[k] = 0.35
+
+        return strengths
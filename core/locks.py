@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+from asyncio import CancelledError, Future, get_running_loop
+from collections import deque
+from collections.abc import Hashable
+
+
+class _Entry:
+    __slots__ = ("users", "waiters")
+
+    def __init__(self):
+        self.users = 1
+        """持有者 + 等待者数"""
+        self.waiters: deque[Future[None]] | None = None
+        """等待者，只在发生竞争时创建"""
+
+
+class _Guard:
+    __slots__ = ("_entry", "_key", "_owner")
+
+    def __init__(self, owner: KeyedLock, key: Hashable):
+        self._owner = owner
+        self._key = key
+        self._entry: _Entry | None = None
+
+    async def __aenter__(self) -> None:
+        self._entry = await self._owner._acquire(self._key)
+
+    async def __aexit__(self, *exc) -> None:
+        assert self._entry is not None
+        self._owner._release(self._key, self._entry)
+
+
+class KeyedLock:
+    """
+    按键串行的锁表
+
+    - 同一个键的临界区依次执行，不同键之间互不等待
+    - 无竞争时只记占用计数，不创建锁对象；发生竞争时等待者按到达顺序依次接手
+    - 键在无人持有或等待时立即回收，锁表大小只与并发中的键数有关
+    - 统计获取次数、需要等待的次数与累计等待时间，作为竞争指标
+    """
+
+    __slots__ = ("_entries", "acquires", "contended", "wait_seconds")
+
+    def __init__(self):
+        self._entries: dict[Hashable, _Entry] = {}
+        self.acquires = 0
+        self.contended = 0
+        """获取时该键已被持有、需要等待的次数"""
+        self.wait_seconds = 0.0
+
+    def __call__(self, key: Hashable) -> _Guard:
+        """用法：async with locks(key): ..."""
+        return _Guard(self, key)
+
+    def busy(self, key: Hashable) -> bool:
+        """该键当前是否有人持有或等待"""
+        return key in self._entries
+
+    async def _acquire(self, key: Hashable) -> _Entry:
+        self.acquires += 1
+        entry = self._entries.get(key)
+        if entry is None:
+            # 无人持有：直接占用，不创建锁对象，也不让出事件循环
+            entry = self._entries[key] = _Entry()
+            return entry
+        entry.users += 1
+        self.contended += 1
+        if entry.waiters is None:
+            entry.waiters = deque()
+        fut: Future[None] = get_running_loop().create_future()
+        entry.waiters.append(fut)
+        start = time.perf_counter()
+        try:
+            await fut
+        except CancelledError:
+            entry.users -= 1
+            # 已被移交持有权但未能恢复执行，转交给下一个等待者
+            if fut.done() and not fut.cancelled():
+                self._handoff(key, entry)
+            elif entry.users == 0:
+                self._drop(key, entry)
+            raise
+        self.wait_seconds += time.perf_counter() - start
+        return entry
+
+    def _release(self, key: Hashable, entry: _Entry) -> None:
+        entry.users -= 1
+        self._handoff(key, entry)
+
+    def _handoff(self, key: Hashable, entry: _Entry) -> None:
+        """把持有权移交给最早的有效等待者，没有等待者时回收该键"""
+        waiters = entry.waiters
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        if entry.users == 0:
+            self._drop(key, entry)
+
+    def _drop(self, key: Hashable, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def stats(self, prefix: str) -> dict[str, int | float]:
+        return {
+            f"{prefix}_lock_keys": len(self._entries),
+            f"{prefix}_lock_acquires": self.acquires,
+            f"{prefix}_lock_contended": self.contended,
+            f"{prefix}_lock_wait_ms": round(self.wait_seconds * 1000, 3),
+        }
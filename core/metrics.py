@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from astrbot.api import logger
+
+from .model import StepResult
+
+if TYPE_CHECKING:
+    from .config import MonitorConfig
+
+# 步骤耗时分桶上界（秒），覆盖微秒级同步步骤到秒级评分超时
+BUCKETS: tuple[float, ...] = (
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    1e-2,
+    2.5e-2,
+    5e-2,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class Histogram:
+    """固定分桶直方图，最后一个桶为 +Inf"""
+
+    __slots__ = ("count", "counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # bisect_left：恰好等于上界的值落入该桶（le 语义）
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """按分桶估计分位数（返回所在桶的上界，落入 +Inf 桶时返回最大上界）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[min(i, len(BUCKETS) - 1)]
+        return BUCKETS[-1]
+
+
+def outcome_of(result: StepResult) -> str:
+    """把步骤结果归类为 wake / block / abort / skip"""
+    if result.wake is True:
+        return "wake"
+    if result.wake is False:
+        return "block"
+    if result.abort:
+        return "abort"
+    return "skip"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    运行指标
+    - 每个步骤一份耗时直方图
+    - 按 (步骤, 结果, 原因码) 计数
+    - 通用事件计数，如防抖合并、沉默触发
+    """
+
+    PREFIX = "wakepro"
+
+    def __init__(self):
+        self.cfg: MonitorConfig | None = None
+        self.steps: dict[str, Histogram] = defaultdict(Histogram)
+        self.outcomes: dict[tuple[str, str, str], int] = defaultdict(int)
+        """(步骤, 结果, 原因码) -> 次数"""
+        self.events: dict[tuple[str, str], int] = defaultdict(int)
+        """(事件名, 种类) -> 次数"""
+        self.gauges: dict[str, Callable[[], dict[str, int | float]]] = {}
+        """导出时调用的外部指标来源：名称 -> 返回 {指标: 值}"""
+
+    def configure(self, cfg: MonitorConfig) -> None:
+        """绑定配置节点，开关实时生效"""
+        self.cfg = cfg
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg is None or bool(self.cfg.enabled)
+
+    def observe_step(self, step: str, seconds: float, result: StepResult) -> None:
+        self.steps[step].observe(seconds)
+        self.outcomes[(step, outcome_of(result), result.reason or "")] += 1
+
+    def inc(self, name: str, kind: str = "") -> None:
+        if self.enabled:
+            self.events[(name, kind)] += 1
+
+    def register_gauges(
+        self, name: str, source: Callable[[], dict[str, int | float]]
+    ) -> None:
+        self.gauges[name] = source
+
+    def reset(self) -> None:
+        self.steps.clear()
+        self.outcomes.clear()
+        self.events.clear()
+
+    # ---------------------------------------------------------
+    # 导出
+    # ---------------------------------------------------------
+    def summary(self, top: int = 5) -> str:
+        """供管理员指令查看的简要统计"""
+        lines = ["【步骤耗时】"]
+        for step, h in self.steps.items():
+            mean = h.sum / h.count if h.count else 0.0
+            lines.append(
+                f"{step}: {h.count} 次, 平均 {mean * 1e6:.1f}us, "
+                f"p50≤{h.quantile(0.5) * 1e6:g}us, p99≤{h.quantile(0.99) * 1e6:g}us"
+            )
+        lines.append("【步骤结果】")
+        ranked = sorted(self.outcomes.items(), key=lambda kv: kv[1], reverse=True)
+        for (step, outcome, reason), n in ranked[:top]:
+            lines.append(f"{step}/{outcome}/{reason or '-'}: {n}")
+        if self.events:
+            lines.append("【事件】")
+            for (name, kind), n in sorted(self.events.items()):
+                lines.append(f"{name}{f'({kind})' if kind else ''}: {n}")
+        for name, source in self.gauges.items():
+            stats = source()
+            if stats:
+                lines.append(f"【{name}】")
+                lines.append(", ".join(f"{k}={v}" for k, v in stats.items()))
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        p = self.PREFIX
+        out: list[str] = []
+
+        name = f"{p}_step_duration_seconds"
+        out.append(f"# HELP {name} Latency of each pipeline step.")
+        out.append(f"# TYPE {name} histogram")
+        for step, h in self.steps.items():
+            label = f'step="{_escape(step)}"'
+            cumulative = 0
+            for le, c in zip(BUCKETS, h.counts):
+                cumulative += c
+                out.append(f'{name}_bucket{{{label},le="{le:g}"}} {cumulative}')
+            out.append(f'{name}_bucket{{{label},le="+Inf"}} {h.count}')
+            out.append(f"{name}_sum{{{label}}} {h.sum:.9f}")
+            out.append(f"{name}_count{{{label}}} {h.count}")
+
+        name = f"{p}_step_outcomes_total"
+        out.append(f"# HELP {name} Step results by outcome and reason code.")
+        out.append(f"# TYPE {name} counter")
+        for (step, outcome, reason), n in self.outcomes.items():
+            out.append(
+                f'{name}{{step="{_escape(step)}",outcome="{outcome}",'
+                f'reason="{_escape(reason)}"}} {n}'
+            )
+
+        seen: set[str] = set()
+        for (event, kind), n in self.events.items():
+            name = f"{p}_{event}_total"
+            if name not in seen:
+                seen.add(name)
+                out.append(f"# TYPE {name} counter")
+            out.append(f'{name}{{kind="{_escape(kind)}"}} {n}')
+
+        for source_name, source in self.gauges.items():
+            for key, value in source().items():
+                name = f"{p}_{source_name}_{key}"
+                out.append(f"# TYPE {name} gauge")
+                out.append(f"{name} {value}")
+        return "\n".join(out) + "\n"
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str) -> None:
+        """先写临时文件再替换，node_exporter 不会读到半个文件"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    async def write_textfile(self, path: str | Path) -> None:
+        # 指标在事件循环上渲染（避免与更新并发），文件写入放到线程中
+        await asyncio.to_thread(
+            self._write_atomic, Path(path), self.render_prometheus()
+        )
+
+    async def export_loop(self) -> None:
+        """按配置定期导出 textfile，路径为空时只等待不写入"""
+        while True:
+            cfg = self.cfg
+            interval = cfg.textfile_interval if cfg else 0
+            await asyncio.sleep(interval if interval > 0 else 15)
+            if not cfg or not cfg.enabled or not cfg.textfile_path:
+                continue
+            try:
+                await self.write_textfile(cfg.textfile_path)
+            except OSError as e:
+                logger.warning(f"写入指标文件失败: {e}")
+
+
+metrics = Metrics()
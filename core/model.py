@@ -1,34 +1,29 @@
 import asyncio
+import heapq
+import itertools
+import math
+import time
 from collections import OrderedDict, deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, TypeVar
+from typing import TYPE_CHECKING, Any, ClassVar
 
 from pydantic import BaseModel, ConfigDict, Field
 
-from astrbot.core.message.components import BaseMessageComponent
+from astrbot.core.message.components import BaseMessageComponent, Plain
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 
-K = TypeVar("K")
-V = TypeVar("V")
+from .analysis import MessageAnalysis
+from .backend import MemoryBackend, StateBackend
+from .expiry import GROUP, SilenceIndex
+from .locks import KeyedLock
 
+if TYPE_CHECKING:
+    from .config import MemoryConfig, WakeConfig
 
-class FixedDict(OrderedDict[K, V]):
-    """定长字典"""
 
-    def __init__(self, maxlen: int):
-        super().__init__()
-        self.maxlen = maxlen
-
-    def __setitem__(self, key: K, value: V):
-        if key in self:
-            del self[key]
-        super().__setitem__(key, value)
-        if len(self) > self.maxlen:
-            self.popitem(last=False)
-
-
-class MemberState(BaseModel):
+@dataclass(slots=True)
+class MemberState:
     """
     成员状态
     """
@@ -45,10 +40,62 @@ class MemberState(BaseModel):
     """是否可以延长唤醒"""
     last_reply: float = 0.0
     """上次回复时间"""
-    lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
-    """成员锁"""
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-    """模型配置"""
+
+
+@dataclass(slots=True)
+class BotMessageRecord:
+    """
+    机器人消息记录（发送时预计算一次，供复读判定与相关性计算复用）
+    """
+
+    text: str
+    """原始文本"""
+    stripped: str
+    """归一化并去掉标点、空白后的文本，用于复读判定"""
+    tokens: list[str]
+    """分词结果（已去停用词）"""
+    tf: dict[str, int]
+    """词频向量"""
+    is_noise: bool = False
+    """是否为噪音消息（表情、纯符号、纯 CQ 码等）"""
+    is_template: bool = False
+    """是否为模板句（token 过少）"""
+    vector: tuple[int, Any] | None = None
+    """相关性向量缓存 (统计版本号, 向量)"""
+
+    @property
+    def usable(self) -> bool:
+        """是否可参与相关性计算"""
+        return not self.is_noise and not self.is_template and bool(self.tf)
+
+
+@dataclass(slots=True)
+class MessageRate:
+    """
+    群消息速率（指数衰减计数）
+    稳定速率 r 条/秒时，计数收敛到 r * window
+    """
+
+    window: float = 60.0
+    """衰减时间常数（秒）"""
+    count: float = 0.0
+    """衰减后的消息计数"""
+    last: float = 0.0
+    """上次计数时间"""
+    degraded: bool = False
+    """是否处于降级模式"""
+
+    @property
+    def per_minute(self) -> float:
+        return self.count * 60 / self.window
+
+    def hit(self, now: float) -> float:
+        """计入一条消息，返回当前速率（条/分钟）"""
+        if self.last:
+            self.count *= math.exp(-max(0.0, now - self.last) / self.window)
+        self.count += 1
+        self.last = now
+        return self.per_minute
 
 
 class GroupState(BaseModel):
@@ -58,14 +105,14 @@ class GroupState(BaseModel):
 
     gid: str
     """群组 ID"""
-    members: FixedDict[str, MemberState] = Field(
-        default_factory=lambda: FixedDict(maxlen=15)
-    )
-    """群组成员状态"""
+    members: OrderedDict[str, MemberState] = Field(default_factory=OrderedDict)
+    """群组成员状态，按最近发言排序（最久未发言的在前）"""
     shutup_until: float = 0.0
     """闭嘴到期时间"""
-    bot_msgs: deque = Field(default_factory=lambda: deque(maxlen=5))
+    bot_msgs: deque[BotMessageRecord] = Field(default_factory=lambda: deque(maxlen=5))
     """机器人消息缓存队列"""
+    rate: MessageRate = Field(default_factory=MessageRate)
+    """消息速率"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
     """模型配置"""
 
@@ -73,15 +120,250 @@ class GroupState(BaseModel):
 class StateManager:
     """内存状态管理"""
 
-    _groups: dict[str, GroupState] = {}
-    _pending_requests: dict[str, "PendingWakeRequest"] = {}
-    _pending_lock = asyncio.Lock()
+    _groups: ClassVar[OrderedDict[str, GroupState]] = OrderedDict()
+    """群组状态，按最近活跃排序（最久未活跃的在前）"""
+    _last_active: ClassVar[dict[str, float]] = {}
+    """群组最近活跃时间"""
+    _memory: "MemoryConfig | None" = None
+    _wake: "WakeConfig | None" = None
+    evictions = 0
+    """累计淘汰的群组数"""
+    member_evictions = 0
+    """累计淘汰的成员数"""
+    _silences = SilenceIndex()
+    """当前生效的群闭嘴与成员沉默"""
+    backend: StateBackend = MemoryBackend()
+    """共享状态后端，默认仅进程内存"""
+    _dirty_groups: ClassVar[set[str]] = set()
+    """自上次取走以来有变化或被淘汰的群，供状态快照增量写入"""
+    _dirty_members: ClassVar[set[tuple[str, str]]] = set()
+    """自上次取走以来有变化或被淘汰的成员 (群号, 用户 ID)"""
+    _pending_requests: ClassVar[dict[str, "PendingWakeRequest"]] = {}
+    _pending_locks = KeyedLock()
+    """挂起请求按键串行，不同用户互不等待"""
+    member_locks = KeyedLock()
+    """成员状态的临界区，键为 (群号, 用户 ID)"""
+    _pending_heap: ClassVar[list[tuple[float, int, str, "PendingWakeRequest"]]] = []
+    """(过期时间, 序号, 键, 请求)；被替换或已取走的请求留在堆中，到期时丢弃"""
+    _pending_seq = itertools.count()
+    _expiry_task: "asyncio.Task[None] | None" = None
+    _expiry_wakeup: asyncio.Event | None = None
+    pending_expired = 0
+    """累计过期清理的挂起请求数"""
+
+    @classmethod
+    def configure(cls, cfg: "MemoryConfig", wake: "WakeConfig") -> None:
+        """绑定内存与唤醒配置节点，容量、闲置时间与延长唤醒窗口实时生效"""
+        cls._memory = cfg
+        cls._wake = wake
+
+    @classmethod
+    def use_backend(cls, backend: StateBackend) -> None:
+        cls.backend = backend
+
+    @classmethod
+    def get_group(cls, gid: str, now: float | None = None) -> GroupState:
+        """取群组状态并刷新其活跃时间；新建群组时顺带淘汰过期或超量的群组"""
+        if now is None:
+            now = time.time()
+        group = cls._groups.get(gid)
+        if group is None:
+            group = cls._groups[gid] = GroupState(gid=gid)
+            cls.backend.load_group(group)
+            cls._evict(now, keep=gid)
+        else:
+            cls._groups.move_to_end(gid)
+        cls._last_active[gid] = now
+        cls._dirty_groups.add(gid)
+        return group
+
+    @classmethod
+    def get_member(cls, group: GroupState, uid: str, now: float) -> MemberState:
+        """取成员状态并标记为最近活跃；新建成员时顺带淘汰超出容量的成员"""
+        members = group.members
+        member = members.get(uid)
+        if member is None:
+            member = members[uid] = MemberState(uid=uid)
+            cls.backend.load_member(group, member)
+            cls._evict_members(group, now, keep=uid)
+        else:
+            members.move_to_end(uid)
+        return member
+
+    @classmethod
+    def _is_member_active(cls, member: MemberState, now: float) -> bool:
+        """成员仍处于沉默期，或仍在延长唤醒窗口内"""
+        if member.silence_until > now:
+            return True
+        prolong = cls._wake.prolong if cls._wake else 0
+        return member.can_prolong and prolong > 0 and now - member.last_reply <= prolong
+
+    @classmethod
+    def _evict_members(cls, group: GroupState, now: float, keep: str) -> None:
+        """
+        从最久未发言的成员开始淘汰，直到不超过容量
+        沉默中或可延长唤醒的成员不淘汰，移到队尾；全部受保护时允许暂时超出容量
+        """
+        capacity = cls._memory.member_capacity if cls._memory else 0
+        members = group.members
+        if capacity <= 0 or len(members) <= capacity:
+            return
+        for _ in range(len(members)):
+            if len(members) <= capacity:
+                break
+            uid, member = next(iter(members.items()))
+            if uid == keep:
+                break
+            if cls._is_member_active(member, now):
+                members.move_to_end(uid)
+                continue
+            del members[uid]
+            cls._dirty_members.add((group.gid, uid))
+            cls.member_evictions += 1
+
+    @classmethod
+    def shutup_group(cls, group: GroupState, until: float) -> None:
+        """群聊级闭嘴到 until"""
+        group.shutup_until = until
+        cls._silences.add(group.gid, GROUP, until)
+        cls._dirty_groups.add(group.gid)
+        cls.backend.publish_group(group)
+
+    @classmethod
+    def silence_member(cls, group: GroupState, member: MemberState, until: float):
+        """成员沉默到 until"""
+        member.silence_until = until
+        cls._silences.add(group.gid, member.uid, until)
+        cls._dirty_members.add((group.gid, member.uid))
+        cls.backend.publish_member(group, member)
+
+    @classmethod
+    def mark_wake(cls, group: GroupState, member: MemberState, now: float) -> None:
+        """记录成员唤醒时间（唤醒 CD 依据）"""
+        member.last_wake = now
+        cls._dirty_members.add((group.gid, member.uid))
+        cls.backend.publish_member(group, member)
+
+    @classmethod
+    def mark_reply(cls, group: GroupState, member: MemberState, now: float) -> None:
+        """记录 bot 回复该成员的时间（延长唤醒依据）"""
+        member.last_reply = now
+        cls._dirty_members.add((group.gid, member.uid))
+
+    @classmethod
+    def set_prolong(cls, group: GroupState, member: MemberState, value: bool) -> None:
+        """记录成员能否延长唤醒"""
+        member.can_prolong = value
+        cls._dirty_members.add((group.gid, member.uid))
+
+    @classmethod
+    def merge_group(cls, group: GroupState, shutup_until: float) -> None:
+        """合并后端传来的群闭嘴时间（取较晚者，不回写后端）"""
+        if shutup_until > group.shutup_until:
+            group.shutup_until = shutup_until
+            cls._silences.add(group.gid, GROUP, shutup_until)
+            cls._dirty_groups.add(group.gid)
+
+    @classmethod
+    def merge_member(
+        cls,
+        group: GroupState,
+        member: MemberState,
+        silence_until: float,
+        last_wake: float,
+    ) -> None:
+        """合并后端传来的成员沉默与唤醒时间（取较晚者，不回写后端）"""
+        changed = False
+        if silence_until > member.silence_until:
+            member.silence_until = silence_until
+            cls._silences.add(group.gid, member.uid, silence_until)
+            changed = True
+        if last_wake > member.last_wake:
+            member.last_wake = last_wake
+            changed = True
+        if changed:
+            cls._dirty_members.add((group.gid, member.uid))
+
+    @classmethod
+    def take_dirty(cls) -> tuple[set[str], set[tuple[str, str]]]:
+        """取走并清空变化记录：(群号集合, (群号, 用户 ID) 集合)"""
+        groups, members = cls._dirty_groups, cls._dirty_members
+        cls._dirty_groups, cls._dirty_members = set(), set()
+        return groups, members
+
+    @classmethod
+    def restore_dirty(cls, groups: set[str], members: set[tuple[str, str]]) -> None:
+        """写入失败时把取走的变化记录放回，下次重试"""
+        cls._dirty_groups |= groups
+        cls._dirty_members |= members
+
+    @classmethod
+    def silenced(cls, gid: str, now: float) -> list[tuple[str, float]]:
+        """
+        群内当前仍在沉默的对象，按到期时间排序
+        :return: [(用户 ID，整群闭嘴时为空串, 到期时间)]
+        """
+        cls._silences.sweep(now)
+        return cls._silences.silenced(gid, now)
+
+    @classmethod
+    def silenced_groups(cls, now: float) -> list[str]:
+        """当前有沉默记录的群号"""
+        cls._silences.sweep(now)
+        return cls._silences.groups()
 
     @classmethod
-    def get_group(cls, gid: str) -> GroupState:
-        if gid not in cls._groups:
-            cls._groups[gid] = GroupState(gid=gid)
-        return cls._groups[gid]
+    def _is_silenced(cls, group: GroupState, now: float) -> bool:
+        """群或群内成员仍处于沉默期（查索引，不遍历成员）"""
+        return cls._silences.is_silenced(group.gid, now)
+
+    @classmethod
+    def _evict(cls, now: float, keep: str) -> None:
+        """
+        从最久未活跃的群开始淘汰，直到满足群数上限与闲置时间
+        仍在沉默期的群不淘汰，移到队尾等沉默结束后再处理
+        """
+        cfg = cls._memory
+        if cfg is None:
+            return
+        max_groups = cfg.state_max_groups
+        ttl = cfg.state_group_ttl
+        if max_groups <= 0 and ttl <= 0:
+            return
+        cls._silences.sweep(now)
+        for _ in range(len(cls._groups)):
+            gid, group = next(iter(cls._groups.items()))
+            if gid == keep:
+                break
+            over = (max_groups > 0 and len(cls._groups) > max_groups) or (
+                ttl > 0 and now - cls._last_active.get(gid, now) > ttl
+            )
+            if not over:
+                break
+            if cls._is_silenced(group, now):
+                cls._groups.move_to_end(gid)
+                continue
+            del cls._groups[gid]
+            cls._last_active.pop(gid, None)
+            cls._dirty_groups.add(gid)
+            cls._dirty_members.update((gid, uid) for uid in group.members)
+            cls._silences.drop_group(gid)
+            cls.evictions += 1
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            "groups": len(cls._groups),
+            "members": sum(len(g.members) for g in cls._groups.values()),
+            "evictions": cls.evictions,
+            "member_evictions": cls.member_evictions,
+            **cls._silences.stats(),
+            "pending": len(cls._pending_requests),
+            "pending_heap": len(cls._pending_heap),
+            "pending_expired": cls.pending_expired,
+            **cls._pending_locks.stats("pending"),
+            **cls.member_locks.stats("member"),
+        }
 
     @staticmethod
     def get_pending_key(umo: str, uid: str) -> str:
@@ -96,7 +378,7 @@ class StateManager:
         window: float,
         current_event: AstrMessageEvent,
     ) -> "PendingWakeRequest | None":
-        async with cls._pending_lock:
+        async with cls._pending_locks(key):
             pending = cls._pending_requests.get(key)
             if not pending:
                 return None
@@ -120,12 +402,9 @@ class StateManager:
         *,
         window: float,
     ) -> None:
-        async with cls._pending_lock:
-            cls._pop_pending_unlocked(key)
-            pending.cleanup_task = asyncio.create_task(
-                cls._expire_pending_request(key, pending.event, window)
-            )
+        async with cls._pending_locks(key):
             cls._pending_requests[key] = pending
+            cls._schedule_expiry(key, pending, window)
 
     @classmethod
     async def clear_pending_request(
@@ -134,7 +413,7 @@ class StateManager:
         *,
         event: AstrMessageEvent | None = None,
     ) -> bool:
-        async with cls._pending_lock:
+        async with cls._pending_locks(key):
             pending = cls._pending_requests.get(key)
             if not pending:
                 return False
@@ -145,36 +424,128 @@ class StateManager:
 
     @classmethod
     def _pop_pending_unlocked(cls, key: str) -> "PendingWakeRequest | None":
-        pending = cls._pending_requests.pop(key, None)
-        if pending and pending.cleanup_task and not pending.cleanup_task.done():
-            pending.cleanup_task.cancel()
-        return pending
+        return cls._pending_requests.pop(key, None)
 
+    # ---------------------------------------------------------
+    # 挂起请求过期：单个后台循环 + 过期时间堆
+    # ---------------------------------------------------------
     @classmethod
-    async def _expire_pending_request(
-        cls,
-        key: str,
-        event: AstrMessageEvent,
-        window: float,
+    def _schedule_expiry(
+        cls, key: str, pending: "PendingWakeRequest", window: float
     ) -> None:
-        try:
-            await asyncio.sleep(window)
-            async with cls._pending_lock:
-                pending = cls._pending_requests.get(key)
-                if pending and pending.event is event:
-                    cls._pop_pending_unlocked(key)
-        except asyncio.CancelledError:
-            return
+        """登记过期时间；只有比当前最早的过期时间更早时才唤醒过期循环"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + window
+        heap = cls._pending_heap
+        earliest = not heap or deadline < heap[0][0]
+        heapq.heappush(heap, (deadline, next(cls._pending_seq), key, pending))
+        task = cls._expiry_task
+        if task is None or task.done():
+            cls._expiry_wakeup = asyncio.Event()
+            cls._expiry_task = loop.create_task(cls._expiry_loop())
+        elif earliest and cls._expiry_wakeup:
+            cls._expiry_wakeup.set()
+
+    @classmethod
+    async def _expiry_loop(cls) -> None:
+        """睡到最早的过期时间，再批量清理所有到期请求"""
+        loop = asyncio.get_running_loop()
+        wakeup = cls._expiry_wakeup
+        assert wakeup is not None
+        while True:
+            wakeup.clear()
+            heap = cls._pending_heap
+            if not heap:
+                await wakeup.wait()
+                continue
+            delay = heap[0][0] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:  # noqa: UP041
+                    pass
+                continue
+            for key, pending in cls._expire_due(loop.time()):
+                async with cls._pending_locks(key):
+                    cls._expire_one(key, pending)
+
+    @classmethod
+    def _expire_due(cls, now: float) -> list[tuple[str, "PendingWakeRequest"]]:
+        """
+        清理到期请求；该键的锁空闲时直接清理（期间不让出事件循环，无需加锁）
+        :return: 锁正被占用、需要排队清理的 (键, 请求)
+        """
+        heap = cls._pending_heap
+        deferred: list[tuple[str, PendingWakeRequest]] = []
+        while heap and heap[0][0] <= now:
+            _, _, key, pending = heapq.heappop(heap)
+            if cls._pending_locks.busy(key):
+                deferred.append((key, pending))
+            else:
+                cls._expire_one(key, pending)
+        return deferred
+
+    @classmethod
+    def _expire_one(cls, key: str, pending: "PendingWakeRequest") -> None:
+        # 只清理仍是该键当前请求的堆项
+        if cls._pending_requests.get(key) is pending:
+            del cls._pending_requests[key]
+            cls.pending_expired += 1
+
+    @classmethod
+    def stop_pending_expiry(cls) -> None:
+        """停止过期循环并丢弃全部挂起请求"""
+        if cls._expiry_task and not cls._expiry_task.done():
+            cls._expiry_task.cancel()
+        cls._expiry_task = None
+        cls._expiry_wakeup = None
+        cls._pending_heap.clear()
+        cls._pending_requests.clear()
+
+
+class MergeBuffer:
+    """
+    防抖合并缓冲区
+
+    - 合并时只追加新消息的组件与文本片段，不复制、不重新拼接之前的内容
+    - 每条合并后发出的事件都要带上完整且独占的消息链与 message_str，
+      由 build 在发出时一次性生成；因此每次合并的开销与已合并的总长度成正比，
+      一轮防抖的总开销随合并条数平方增长，由 max_merge_count 限制
+    """
+
+    __slots__ = ("_chain", "_parts")
+
+    def __init__(self, chain: list[BaseMessageComponent], plain: str):
+        self._chain: list[BaseMessageComponent] = list(chain)
+        """只追加的消息组件（首条消息链的副本，原事件的消息链不受影响）"""
+        self._parts: list[str] = []
+        """只追加的非空文本片段"""
+        self._add_text(plain)
+
+    def _add_text(self, plain: str) -> None:
+        plain = plain.strip()
+        if plain:
+            self._parts.append(plain)
+
+    def append(self, chain: list[BaseMessageComponent], plain: str) -> None:
+        """追加一条消息，消息链与文本之间以换行分隔"""
+        if self._chain and chain:
+            self._chain.append(Plain("\n", convert=False))
+        self._chain.extend(chain)
+        self._add_text(plain)
+
+    def build(self) -> tuple[list[BaseMessageComponent], str]:
+        """发出事件时调用：返回该事件独占的合并消息链与文本"""
+        return list(self._chain), "\n".join(self._parts)
 
 
 @dataclass(slots=True)
 class PendingWakeRequest:
     event: AstrMessageEvent
-    chain: list[BaseMessageComponent]
-    plain: str
+    buffer: MergeBuffer
+    """该防抖窗口已合并的内容"""
     created_at: float
     merged_count: int = 1
-    cleanup_task: asyncio.Task[None] | None = None
 
 
 @dataclass
@@ -209,6 +580,18 @@ class WakeContext:
     """是否命中了消息防抖窗口"""
     debounce_merged_count: int = 1
     """当前防抖窗口已合并的消息数量"""
+    debounce_buffer: MergeBuffer | None = None
+    """命中防抖窗口时的合并缓冲区，开启下一个窗口时沿用"""
+    degraded: bool = False
+    """群聊消息过密，处于降级模式（跳过主动唤醒信号）"""
+    _analysis: MessageAnalysis | None = field(default=None, repr=False)
+
+    @property
+    def analysis(self) -> MessageAnalysis:
+        """当前纯文本的惰性分析结果（防抖合并改写 plain 后自动失效）"""
+        if self._analysis is None or self._analysis.text is not self.plain:
+            self._analysis = MessageAnalysis(self.plain)
+        return self._analysis
 
 
 class StepName(str, Enum):
@@ -226,8 +609,12 @@ class StepResult:
     """是否唤醒, True 表示唤醒, False 表示阻塞, None 表示跳过"""
     abort: bool = False
     """是否需要中断处理"""
+    reason: str | None = None
+    """原因码（稳定的短标识，用于指标统计）"""
+    args: tuple[Any, ...] = ()
+    """原因码说明的格式化参数，仅在需要输出时才格式化"""
     msg: str | None = None
-    """附加消息"""
+    """附加消息（优先于原因码说明）"""
     data: Any | None = None
     """携带的上下文信息"""
     prolong: bool = False
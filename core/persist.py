@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from astrbot.api import logger
+
+from .model import MemberState, StateManager
+
+if TYPE_CHECKING:
+    from array import array
+
+    from .config import PersistConfig
+    from .similarity import Similarity
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    gid TEXT PRIMARY KEY,
+    shutup_until REAL NOT NULL,
+    last_active REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    gid TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    silence_until REAL NOT NULL,
+    last_speak REAL NOT NULL,
+    last_wake REAL NOT NULL,
+    last_reply REAL NOT NULL,
+    can_prolong INTEGER NOT NULL,
+    PRIMARY KEY (gid, uid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS corpus (
+    gid TEXT PRIMARY KEY,
+    docs TEXT NOT NULL
+);
+"""
+
+
+class _Diff:
+    """一次快照相对上次写入内容的变化"""
+
+    __slots__ = ("corpus", "drop_groups", "drop_members", "groups", "members")
+
+    def __init__(self):
+        self.groups: dict[str, tuple] = {}
+        self.members: dict[tuple[str, str], tuple] = {}
+        self.corpus: dict[str, tuple[int, list[array], dict[int, str]]] = {}
+        """群号 -> (统计版本号, 窗口内各消息的 id 数组, id -> token)，写入线程中再序列化"""
+        self.drop_groups: list[str] = []
+        self.drop_members: list[tuple[str, str]] = []
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.groups
+            or self.members
+            or self.corpus
+            or self.drop_groups
+            or self.drop_members
+        )
+
+
+class StateStore:
+    """
+    唤醒状态快照（SQLite）
+
+    - 启动时一次性批量读取：群沉默、成员沉默 / 唤醒 / 回复时间、相关性统计窗口
+    - 定期取走 StateManager 记录的变化键，只与上次写入的内容比较这些键，
+      写变化的行并删除已淘汰的键；收集开销与变化量成正比，而非状态总量
+    - 数据库读写都放到线程中执行，不阻塞消息处理
+    """
+
+    def __init__(self, path: Path, similarity: Similarity | None = None):
+        self.path = path
+        self.similarity = similarity
+        self.cfg: PersistConfig | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+        """收集、写入、更新“上次写入的内容”整体串行"""
+        self._db_lock = threading.Lock()
+        """等待写入的协程被取消时线程仍在执行，连接上的操作另行串行"""
+        # 上次写入的内容
+        self._groups: dict[str, tuple] = {}
+        self._members: dict[tuple[str, str], tuple] = {}
+        self._corpus: dict[str, int] = {}
+        self._rescan = False
+        """关闭期间丢弃了变化记录，重新开启后的第一次写入需要全量比较"""
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+
+    def configure(self, cfg: PersistConfig) -> None:
+        self.cfg = cfg
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cfg and self.cfg.enabled)
+
+    # ---------------------------------------------------------
+    # 数据库（仅在线程中调用）
+    # ---------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _read_all(self) -> tuple[list[tuple], list[tuple], list[tuple]]:
+        with self._db_lock:
+            return self._read_all_locked()
+
+    def _read_all_locked(self) -> tuple[list[tuple], list[tuple], list[tuple]]:
+        conn = self._connect()
+        groups = conn.execute(
+            "SELECT gid, shutup_until, last_active FROM groups ORDER BY last_active"
+        ).fetchall()
+        members = conn.execute(
+            "SELECT gid, uid, silence_until, last_speak, last_wake, last_reply,"
+            " can_prolong FROM members ORDER BY last_speak"
+        ).fetchall()
+        corpus = conn.execute("SELECT gid, docs FROM corpus").fetchall()
+        return groups, members, corpus
+
+    def _write(self, diff: _Diff) -> int:
+        with self._db_lock:
+            self._write_locked(diff)
+        return (
+            len(diff.groups)
+            + len(diff.members)
+            + len(diff.corpus)
+            + len(diff.drop_groups)
+            + len(diff.drop_members)
+        )
+
+    def _write_locked(self, diff: _Diff) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO groups VALUES (?, ?, ?)",
+                [(gid, *row) for gid, row in diff.groups.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, *row) for key, row in diff.members.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO corpus VALUES (?, ?)",
+                [
+                    (gid, self._dump_docs(history, names))
+                    for gid, (_, history, names) in diff.corpus.items()
+                ],
+            )
+            conn.executemany(
+                "DELETE FROM groups WHERE gid = ?", [(g,) for g in diff.drop_groups]
+            )
+            conn.executemany(
+                "DELETE FROM corpus WHERE gid = ?", [(g,) for g in diff.drop_groups]
+            )
+            conn.executemany(
+                "DELETE FROM members WHERE gid = ? AND uid = ?", diff.drop_members
+            )
+
+    @staticmethod
+    def _dump_docs(history: list[array], names: dict[int, str]) -> str:
+        docs = [[names[tid] for tid in doc] for doc in history]
+        return json.dumps(docs, ensure_ascii=False, separators=(",", ":"))
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---------------------------------------------------------
+    # 读取
+    # ---------------------------------------------------------
+    async def load(self) -> None:
+        """启动时批量读取快照并还原到内存"""
+        async with self._lock:
+            groups, members, corpus = await asyncio.to_thread(self._read_all)
+
+        # 直接还原字段（merge_*），不经 shutup_group / silence_member 重新发布到共享后端
+        for gid, shutup_until, last_active in groups:
+            group = StateManager.get_group(gid, last_active)
+            StateManager.merge_group(group, shutup_until)
+            self._groups[gid] = (shutup_until, last_active)
+        for gid, uid, *row in members:
+            group = StateManager._groups.get(gid)
+            if group is None:
+                continue
+            silence_until, last_speak, last_wake, last_reply, can_prolong = row
+            member = group.members[uid] = MemberState(
+                uid=uid,
+                last_speak=last_speak,
+                can_prolong=bool(can_prolong),
+                last_reply=last_reply,
+            )
+            StateManager.merge_member(group, member, silence_until, last_wake)
+            self._members[(gid, uid)] = self._member_row(member)
+        if self.similarity:
+            for gid, docs in corpus:
+                self._corpus[gid] = self.similarity.restore(gid, json.loads(docs))
+        logger.info(
+            f"已从 {self.path.name} 恢复 {len(groups)} 个群、{len(members)} 个成员、"
+            f"{len(corpus)} 份相关性统计"
+        )
+
+    # ---------------------------------------------------------
+    # 写入
+    # ---------------------------------------------------------
+    @staticmethod
+    def _member_row(m: MemberState) -> tuple:
+        return (m.silence_until, m.last_speak, m.last_wake, m.last_reply, m.can_prolong)
+
+    def _collect(self, groups: set[str], members: set[tuple[str, str]]) -> _Diff:
+        """在事件循环上把变化键与上次写入的内容比较，只收集变化的部分"""
+        diff = _Diff()
+        live_groups = StateManager._groups
+        last_active = StateManager._last_active
+        for gid in groups:
+            group = live_groups.get(gid)
+            if group is None:
+                if gid in self._groups:
+                    diff.drop_groups.append(gid)
+                continue
+            row: tuple[Any, ...] = (group.shutup_until, last_active.get(gid, 0.0))
+            if self._groups.get(gid) != row:
+                diff.groups[gid] = row
+        for key in members:
+            group = live_groups.get(key[0])
+            member = group.members.get(key[1]) if group is not None else None
+            row = self._member_row(member) if member is not None else ()
+            # 从未被唤醒、沉默或回复过的成员没有需要保存的状态
+            if not row or not (row[0] or row[2] or row[3]):
+                if key in self._members:
+                    diff.drop_members.append(key)
+                continue
+            if self._members.get(key) != row:
+                diff.members[key] = row
+
+        if self.similarity:
+            changed, live = self.similarity.export_changed(self._corpus)
+            diff.corpus.update(changed)
+            live_corpus = set(live)
+            diff.drop_groups.extend(
+                g
+                for g in self._corpus
+                if g not in live_corpus and g not in diff.drop_groups
+            )
+        return diff
+
+    def _commit(self, diff: _Diff) -> None:
+        """写入成功后更新“上次写入的内容”"""
+        self._groups.update(diff.groups)
+        self._members.update(diff.members)
+        for gid, (version, *_) in diff.corpus.items():
+            self._corpus[gid] = version
+        for gid in diff.drop_groups:
+            self._groups.pop(gid, None)
+            self._corpus.pop(gid, None)
+        for key in diff.drop_members:
+            self._members.pop(key, None)
+
+    def _take_dirty(self) -> tuple[set[str], set[tuple[str, str]]]:
+        groups, members = StateManager.take_dirty()
+        if self._rescan:
+            self._rescan = False
+            groups.update(StateManager._groups)
+            groups.update(self._groups)
+            for gid, group in StateManager._groups.items():
+                members.update((gid, uid) for uid in group.members)
+            members.update(self._members)
+        return groups, members
+
+    async def flush(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            groups, members = self._take_dirty()
+            diff = self._collect(groups, members)
+            if diff:
+                try:
+                    self.rows_written += await asyncio.to_thread(self._write, diff)
+                except BaseException:
+                    StateManager.restore_dirty(groups, members)
+                    raise
+                self._commit(diff)
+            self.flushes += 1
+            self.last_flush_ms = (loop.time() - start) * 1000
+
+    async def run(self) -> None:
+        """按配置的间隔定期写快照"""
+        while True:
+            interval = self.cfg.interval if self.cfg else 0
+            await asyncio.sleep(interval if interval > 0 else 60)
+            if not self.enabled:
+                # 关闭期间不积累变化记录，重新开启后全量比较一次
+                StateManager.take_dirty()
+                self._rescan = True
+                continue
+            try:
+                await self.flush()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"写入状态快照失败: {e}")
+
+    async def close(self) -> None:
+        """写最后一次快照并关闭数据库"""
+        try:
+            if self.enabled:
+                await self.flush()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"写入状态快照失败: {e}")
+        finally:
+            async with self._lock:
+                await asyncio.to_thread(self._close)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
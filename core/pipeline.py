@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
 from astrbot.api import logger
 
+from .backend import MemoryBackend, StateBackend
 from .config import PluginConfig
-from .model import WakeContext
+from .executor import scoring
+from .metrics import metrics
+from .model import GroupState, StateManager, StepResult, WakeContext
+from .persist import StateStore
+from .recorder import recorder
+from .sqlite_backend import SqliteBackend
 from .step import (
     BaseStep,
     BlockStep,
@@ -13,6 +27,7 @@ from .step import (
     SilenceStep,
     WakeStep,
 )
+from .trace import tracer
 
 
 class Pipeline:
@@ -33,53 +48,227 @@ class Pipeline:
         SilenceStep,
     ]
 
+    PLAN_CACHE_SIZE = 4096
+    """步骤计划缓存的 (umo, uid, gid) 组合数上限"""
+
     def __init__(self, config: PluginConfig):
         self.plugin_config = config
         self._steps: list[BaseStep] = []
+        self._plans: OrderedDict[tuple[str, str, str], list[BaseStep]] = OrderedDict()
+        self._plans_version = 0
         self._debounce_step: DebounceStep | None = None
+        self._wake_step: WakeStep | None = None
+        self._export_task: asyncio.Task[None] | None = None
+        self._persist_task: asyncio.Task[None] | None = None
+        self.observers: list[
+            Callable[[WakeContext, BaseStep, StepResult, float], None]
+        ] = []
+        """每个步骤执行后回调 (上下文, 步骤, 结果, 耗时秒)，供回放等离线工具使用"""
+        scoring.configure(config.perf)
+        metrics.configure(config.monitor)
+        recorder.configure(config.record, config.data_dir)
+        tracer.configure(config.trace)
+        StateManager.configure(config.memory, config.wake)
         self._build_steps()
+        self.store = StateStore(
+            config.data_dir / "state.db",
+            self._wake_step.similarity if self._wake_step else None,
+        )
+        self.store.configure(config.persist)
+        self.backend = self._build_backend()
+        StateManager.use_backend(self.backend)
+        metrics.register_gauges("scoring", scoring.stats)
+        metrics.register_gauges("record", recorder.stats)
+        metrics.register_gauges("state", StateManager.stats)
+        metrics.register_gauges("persist", self.store.stats)
+        metrics.register_gauges("backend", self.backend.stats)
+        if self._wake_step:
+            metrics.register_gauges("similarity", self._wake_step.similarity.stats)
 
     def _build_steps(self) -> None:
         for cls in self.STEP_REGISTRY:
             step = cls(self.plugin_config)
             if isinstance(step, DebounceStep):
                 self._debounce_step = step
+            elif isinstance(step, WakeStep):
+                self._wake_step = step
             self._steps.append(step)
 
-    # ==================== run =====================
+    def _build_backend(self) -> StateBackend:
+        cfg = self.plugin_config.backend
+        if cfg.kind == SqliteBackend.name:
+            path = (
+                Path(cfg.path)
+                if cfg.path
+                else self.plugin_config.data_dir / "shared_state.db"
+            )
+            return SqliteBackend(path, cfg, self._append_bot_msg)
+        if cfg.kind != MemoryBackend.name:
+            logger.warning(f"未知的状态后端 {cfg.kind}，使用内存后端")
+        return MemoryBackend()
 
-    async def run(self, ctx: WakeContext):
+    # ==================== 生命周期 =====================
+
+    async def initialize(self) -> None:
+        for step in self._steps:
+            await step.initialize()
+        if self.store.enabled:
+            try:
+                await self.store.load()
+            except (sqlite3.Error, OSError, ValueError) as e:
+                logger.warning(f"读取状态快照失败，从空状态启动: {e}")
+        try:
+            await self.backend.start()
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"共享状态后端启动失败，改用内存后端: {e}")
+            self.backend = MemoryBackend()
+            StateManager.use_backend(self.backend)
+        self._export_task = asyncio.create_task(metrics.export_loop())
+        self._persist_task = asyncio.create_task(self.store.run())
+
+    async def terminate(self) -> None:
+        if self._export_task:
+            self._export_task.cancel()
+            self._export_task = None
+        if self._persist_task:
+            self._persist_task.cancel()
+            self._persist_task = None
+        await self.store.close()
+        await self.backend.close()
+        StateManager.use_backend(MemoryBackend())
+        for step in self._steps:
+            await step.terminate()
+        scoring.shutdown()
+        await asyncio.to_thread(recorder.close)
+
+    # ==================== bot 消息 =====================
+
+    def record_bot_msg(
+        self, group: GroupState, text: str, now: float | None = None
+    ) -> None:
+        """缓存本进程 bot 发出的消息，并交给状态后端共享"""
+        self._append_bot_msg(group, text)
+        StateManager.backend.publish_bot_msg(
+            group, text, time.time() if now is None else now
+        )
+
+    def _append_bot_msg(self, group: GroupState, text: str) -> None:
+        """缓存 bot 消息，并在此时一次性预计算其特征"""
+        if self._wake_step:
+            group.bot_msgs.append(self._wake_step.similarity.make_record(text))
+
+    # ==================== 负载 =====================
+
+    def _update_load(self, ctx: WakeContext) -> None:
+        """更新群消息速率，超过阈值进入降级模式，回落到恢复阈值以下时退出"""
+        cfg = self.plugin_config.perf
+        group = ctx.group
+        if not group:
+            return
+        rate = group.rate
+        if cfg.flood_enter_rate <= 0:
+            rate.degraded = False
+            return
+        per_minute = rate.hit(ctx.now)
+        if not rate.degraded and per_minute > cfg.flood_enter_rate:
+            rate.degraded = True
+            logger.info(
+                f"群 {group.gid} 消息速率 {per_minute:.0f} 条/分钟，进入降级模式"
+            )
+        elif rate.degraded and per_minute < cfg.flood_leave_rate:
+            rate.degraded = False
+            logger.info(
+                f"群 {group.gid} 消息速率 {per_minute:.0f} 条/分钟，退出降级模式"
+            )
+        ctx.degraded = rate.degraded
+
+    # ==================== 步骤计划 =====================
+
+    def _plan(self, umo: str, uid: str, gid: str) -> list[BaseStep]:
+        """
+        该身份组合实际需要执行的步骤（按流水线顺序）
+        结果按 (umo, uid, gid) 缓存于 LRU，流水线配置变化后整体失效
+        """
+        cfg = self.plugin_config.pipeline
+        version = cfg.version
+        if version != self._plans_version:
+            self._plans.clear()
+            self._plans_version = version
+
+        key = (umo, uid, gid)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+
+        plan = []
         for step in self._steps:
-            if not self.plugin_config.pipeline.is_enabled_step(step.name):
+            if not cfg.is_enabled_step(step.name):
                 continue
-            if self.plugin_config.pipeline.in_whitelist(
-                step.name, ctx.umo, ctx.uid, ctx.gid
-            ):
-                logger.debug(f"步骤 {step.name} 被白名单跳过")
+            if cfg.in_whitelist(step.name, umo, uid, gid):
+                logger.debug("步骤 %s 被白名单跳过", step.name.value)
                 continue
-            if self.plugin_config.pipeline.in_blacklist(
-                step.name, ctx.umo, ctx.uid, ctx.gid
-            ):
-                logger.debug(f"步骤 {step.name} 被黑名单跳过")
+            if cfg.in_blacklist(step.name, umo, uid, gid):
+                logger.debug("步骤 %s 被黑名单跳过", step.name.value)
                 continue
-            # 执行
-            result = await step.handle(ctx)
+            plan.append(step)
+        self._plans[key] = plan
+        if len(self._plans) > self.PLAN_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        return plan
+
+    # ==================== run =====================
+
+    async def run(self, ctx: WakeContext):
+        # 同一成员的消息依次走完流水线，last_wake / can_prolong 等读改写不会交错
+        if ctx.member:
+            async with StateManager.member_locks((ctx.gid, ctx.uid)):
+                await self._run(ctx)
+        else:
+            await self._run(ctx)
+
+    async def _run(self, ctx: WakeContext):
+        self._update_load(ctx)
+        observed = metrics.enabled
+        seq = tracer.begin(ctx) if tracer.enabled else 0
+        timed = observed or seq or bool(self.observers)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for step in self._plan(ctx.umo, ctx.uid, ctx.gid):
+            # 执行（同步步骤直接返回结果，只有真正需要等待的才返回 awaitable）
+            if timed:
+                start = time.perf_counter()
+                result = step.handle(ctx)
+                if not isinstance(result, StepResult):
+                    result = await result
+                elapsed = time.perf_counter() - start
+                if observed:
+                    metrics.observe_step(step.name.value, elapsed, result)
+                if seq:
+                    tracer.add(seq, step, result, elapsed)
+                for observer in self.observers:
+                    observer(ctx, step, result, elapsed)
+            else:
+                result = step.handle(ctx)
+                if not isinstance(result, StepResult):
+                    result = await result
             # 标记唤醒
             if result.wake is True:
-                if ctx.member:
-                    ctx.member.last_wake = ctx.now
+                if ctx.group and ctx.member:
+                    StateManager.mark_wake(ctx.group, ctx.member, ctx.now)
                 ctx.event.is_at_or_wake_command = True
                 if self._debounce_step:
                     await self._debounce_step.activate_window(ctx)
             # 停止事件传播
             elif result.wake is False:
                 ctx.event.stop_event()
-            # 日志
-            if result.msg:
-                logger.debug(result.msg)
-            # 记录延长唤醒
-            if ctx.member:
-                ctx.member.can_prolong = result.prolong
+            # 日志（说明文字只在调试日志开启时格式化）
+            if debug and (result.reason or result.msg):
+                logger.debug(step.describe(result))
+            # 记录延长唤醒（值不变时不写，避免每条消息都把成员标记为待写入快照）
+            if ctx.group and ctx.member and ctx.member.can_prolong != result.prolong:
+                StateManager.set_prolong(ctx.group, ctx.member, result.prolong)
             # 中断流水线
             if result.abort:
                 break
+        if seq:
+            tracer.finish(seq, ctx)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import queue
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from astrbot.api import logger
+from astrbot.core.message.components import (
+    At,
+    BaseMessageComponent,
+    Image,
+    Plain,
+    Reply,
+)
+
+from .step.debounce import DebounceStep
+
+if TYPE_CHECKING:
+    from .config import RecordConfig
+    from .model import WakeContext
+
+
+class TraceRecorder:
+    """
+    消息录制器：把群消息与 bot 回复匿名化后写入 gzip 压缩的 JSONL
+
+    每行一条记录：
+    - msg：{"k", "ts", "umo", "g", "u", "b", "admin", "cmd", "plain",
+      "chain", "woken", "stopped"}，woken / stopped 为线上流水线的判定结果
+    - reply：{"k", "ts", "umo", "g", "u", "text"}
+
+    ID 一律加盐哈希；消息链只保留摘要（文本、艾特/引用对象、图片是否为 GIF）。
+    序列化在事件循环上完成，压缩与写盘在后台线程进行，队列满时丢弃新记录。
+    """
+
+    FLUSH_INTERVAL = 1.0
+    """写入线程空闲多久后把压缩缓冲刷到磁盘（秒）"""
+
+    def __init__(self):
+        self.cfg: RecordConfig | None = None
+        self.data_dir: Path | None = None
+        self.path: Path | None = None
+        self._key = b""
+        self._queue: queue.Queue[str | None] | None = None
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+        """队列已满被丢弃的记录数"""
+
+    def configure(self, cfg: RecordConfig, data_dir: Path) -> None:
+        """绑定配置节点，开关实时生效"""
+        self.cfg = cfg
+        self.data_dir = data_dir
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cfg and self.cfg.enabled)
+
+    # ---------------------------------------------------------
+    # 记录
+    # ---------------------------------------------------------
+    def hash_id(self, value: Any) -> str:
+        if value is None or value == "":
+            return ""
+        return hashlib.blake2b(
+            str(value).encode(), key=self._key, digest_size=8
+        ).hexdigest()
+
+    def record_message(
+        self, ctx: WakeContext, plain: str, chain: list[BaseMessageComponent]
+    ) -> None:
+        """
+        记录一条已走完流水线的群消息
+        plain / chain 须是进入流水线前的原始内容：防抖会把 ctx 上的换成合并结果，
+        回放时会重新合并
+        """
+        if not self._ensure_started():
+            return
+        h = self.hash_id
+        self._put(
+            {
+                "k": "msg",
+                "ts": ctx.now,
+                "umo": h(ctx.umo),
+                "g": h(ctx.gid),
+                "u": h(ctx.uid),
+                "b": h(ctx.bid),
+                "admin": ctx.is_admin,
+                "cmd": ctx.cmd,
+                "plain": plain,
+                "chain": self._segments(chain),
+                "woken": bool(ctx.event.is_at_or_wake_command),
+                "stopped": ctx.event.is_stopped(),
+            }
+        )
+
+    def record_reply(self, umo: str, gid: str, uid: str, text: str, now: float):
+        """记录一条 bot 回复（uid 为被回复的用户）"""
+        if not self._ensure_started():
+            return
+        h = self.hash_id
+        self._put(
+            {
+                "k": "reply",
+                "ts": now,
+                "umo": h(umo),
+                "g": h(gid),
+                "u": h(uid),
+                "text": text,
+            }
+        )
+
+    def _segments(self, chain: list[BaseMessageComponent]) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for seg in chain:
+            if isinstance(seg, Plain):
+                out.append({"t": "plain", "text": seg.text})
+            elif isinstance(seg, At):
+                qq = str(seg.qq)
+                out.append({"t": "at", "qq": qq if qq == "all" else self.hash_id(qq)})
+            elif isinstance(seg, Reply):
+                out.append({"t": "reply", "sender": self.hash_id(seg.sender_id)})
+            elif isinstance(seg, Image):
+                # 防抖步骤按是否为 GIF 分支，录制时直接记下判定结果
+                out.append({"t": "image", "gif": DebounceStep._is_gif_image(seg)})
+            else:
+                out.append({"t": type(seg).__name__.lower()})
+        return out
+
+    def _put(self, record: dict[str, Any]) -> None:
+        assert self._queue is not None
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------------------------------------------------------
+    # 写入线程
+    # ---------------------------------------------------------
+    def _ensure_started(self) -> bool:
+        if not self.enabled:
+            return False
+        if self._thread is not None:
+            return self._thread.is_alive()
+        assert self.cfg is not None
+        salt = self.cfg.salt or secrets.token_hex(16)
+        self._key = hashlib.blake2b(salt.encode(), digest_size=32).digest()
+        if self.cfg.path:
+            path = Path(self.cfg.path)
+        else:
+            assert self.data_dir is not None
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = self.data_dir / "traces" / f"wakepro-{stamp}.jsonl.gz"
+        self.path = path
+        self._queue = queue.Queue(maxsize=max(1, self.cfg.max_queue))
+        self._thread = threading.Thread(
+            target=self._write_loop,
+            args=(path, self._queue),
+            name="wakepro-record",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info(f"开始录制消息到 {path}")
+        return True
+
+    def _write_loop(self, path: Path, q: queue.Queue[str | None]) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 追加模式会产生多成员 gzip，gzip.open 读取时自动拼接
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                dirty = False
+                while True:
+                    try:
+                        line = q.get(timeout=self.FLUSH_INTERVAL)
+                    except queue.Empty:
+                        if dirty:
+                            f.flush()
+                            dirty = False
+                        continue
+                    if line is None:
+                        break
+                    f.write(line)
+                    self.written += 1
+                    dirty = True
+        except OSError as e:
+            logger.warning(f"写入录制文件失败，录制已停止: {e}")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """写完队列中的记录并关闭文件"""
+        thread, q = self._thread, self._queue
+        self._thread = self._queue = None
+        if thread is None or q is None:
+            return
+        try:
+            q.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("录制队列未能在关闭前写完")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> dict[str, int | float]:
+        if self._thread is None:
+            return {}
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+recorder = TraceRecorder()
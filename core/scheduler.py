@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Signal:
+    """单个可独立求值的唤醒信号"""
+
+    name: str
+    check: Callable[[], bool]
+    """求值函数，返回是否命中"""
+    needs_prepare: bool = False
+    """是否依赖 prepare（如分词），依赖的信号求值前会先执行一次 prepare"""
+    shared: str = ""
+    """依赖的共享计算名（如多个信号共用的情感打分），同一条消息只执行一次，耗时单独统计"""
+    on_skip: Callable[[], None] | None = None
+    """未被求值时的回调（已有信号命中），用于补做必要的副作用；耗时计入预算，预算耗尽后不再执行"""
+
+
+@dataclass(slots=True)
+class SignalStats:
+    calls: int = 0
+    hits: int = 0
+    skipped: int = 0
+    cost: float = 0.0
+    """平均 CPU 耗时（秒，EWMA）"""
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+
+@dataclass(slots=True)
+class ScheduleResult:
+    hit: str | None = None
+    """命中的信号名"""
+    over_budget: bool = False
+    """是否因预算耗尽跳过了剩余信号"""
+    evaluated: list[str] = field(default_factory=list)
+
+
+class SignalScheduler:
+    """
+    代价感知的信号调度器
+
+    - 各信号互相独立、任一命中即唤醒，因此求值顺序不影响决策，只影响耗时
+    - 按实测平均 CPU 耗时（EWMA）从低到高求值，首个命中即返回
+    - prepare 与共享计算的耗时单独统计，不计入首个用到它的信号，避免共用缓存的信号
+      因求值先后互相转嫁耗时、排序来回翻转
+    - 单条消息累计 CPU 耗时（含 prepare、共享计算与 on_skip）超过预算后，
+      跳过剩余信号及其补做的副作用
+    - 统计数据可能被评分线程并发更新，由锁保护
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        """
+        :param alpha: EWMA 平滑系数，越大越偏向最近的耗时
+        """
+        self.alpha = alpha
+        self.stats: dict[str, SignalStats] = {}
+        self.prepare_cost = 0.0
+        """prepare 的平均 CPU 耗时（秒，EWMA）"""
+        self.shared_cost: dict[str, float] = {}
+        """共享计算名 -> 平均 CPU 耗时（秒，EWMA）"""
+        self.over_budget = 0
+        """因预算耗尽提前结束的消息数"""
+        self._lock = threading.Lock()
+
+    def _stats(self, name: str) -> SignalStats:
+        s = self.stats.get(name)
+        if s is None:
+            s = self.stats[name] = SignalStats()
+        return s
+
+    def _ewma(self, old: float, sample: float, first: bool) -> float:
+        return sample if first else old + self.alpha * (sample - old)
+
+    def order(self, signals: Iterable[Signal]) -> list[Signal]:
+        """
+        按平均耗时（含依赖的共享计算）升序排列，尚未测量过的信号排在最前以尽快获得样本；
+        共用同一计算的信号加上的是同一份耗时，彼此之间只按各自的耗时排序
+        """
+        stats, shared_cost = self.stats, self.shared_cost
+
+        def cost(sig: Signal) -> float:
+            s = stats.get(sig.name)
+            if s is None:
+                return -1.0
+            return s.cost + shared_cost.get(sig.shared, 0.0)
+
+        return sorted(signals, key=cost)
+
+    def run(
+        self,
+        signals: Iterable[Signal],
+        budget: float = 0,
+        prepare: Callable[[], object] | None = None,
+        shared: dict[str, Callable[[], object]] | None = None,
+    ) -> ScheduleResult:
+        """
+        依次求值，首个命中即返回
+        :param budget: 单条消息的 CPU 预算（秒），0 表示不限
+        :param prepare: 部分信号共享的前置计算，最多执行一次，其耗时计入预算
+        :param shared: 共享计算名 -> 计算函数，在首个依赖它的信号之前执行一次，
+            其耗时计入预算
+        """
+        result = ScheduleResult()
+        ordered = self.order(signals)
+        start = time.thread_time()
+        prepared = prepare is None
+        pending = dict(shared) if shared else {}
+        rest = iter(ordered)
+
+        for sig in rest:
+            if budget > 0 and time.thread_time() - start >= budget:
+                result.over_budget = True
+                self._skip(sig, run_callback=False)
+                break
+            if sig.needs_prepare and not prepared:
+                t = time.thread_time()
+                prepare()  # type: ignore[misc]
+                self._record_prepare(time.thread_time() - t)
+                prepared = True
+            compute = pending.pop(sig.shared, None) if sig.shared else None
+            if compute is not None:
+                t = time.thread_time()
+                compute()
+                self._record_shared(sig.shared, time.thread_time() - t)
+            t = time.thread_time()
+            hit = sig.check()
+            self._record(sig.name, time.thread_time() - t, hit)
+            result.evaluated.append(sig.name)
+            if hit:
+                result.hit = sig.name
+                break
+
+        for sig in rest:
+            within = budget <= 0 or time.thread_time() - start < budget
+            self._skip(sig, run_callback=within and not result.over_budget)
+        if result.over_budget:
+            with self._lock:
+                self.over_budget += 1
+        return result
+
+    def _record(self, name: str, cost: float, hit: bool) -> None:
+        with self._lock:
+            s = self._stats(name)
+            s.cost = self._ewma(s.cost, cost, s.calls == 0)
+            s.calls += 1
+            s.hits += hit
+
+    def _record_prepare(self, cost: float) -> None:
+        with self._lock:
+            self.prepare_cost = self._ewma(
+                self.prepare_cost, cost, self.prepare_cost == 0
+            )
+
+    def _record_shared(self, name: str, cost: float) -> None:
+        with self._lock:
+            old = self.shared_cost.get(name)
+            self.shared_cost[name] = self._ewma(old or 0.0, cost, old is None)
+
+    def _skip(self, sig: Signal, run_callback: bool) -> None:
+        with self._lock:
+            self._stats(sig.name).skipped += 1
+        if run_callback and sig.on_skip:
+            sig.on_skip()
+
+    def report(self) -> str:
+        """各信号的平均耗时与命中率，按耗时升序"""
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda kv: kv[1].cost)
+            lines = [
+                f"{name}: {s.cost * 1e3:.3f}ms, 命中率 {s.hit_rate:.1%} "
+                f"({s.hits}/{s.calls}), 跳过 {s.skipped}"
+                for name, s in items
+            ]
+            lines.extend(
+                f"共享计算 {name}: {cost * 1e3:.3f}ms"
+                for name, cost in self.shared_cost.items()
+            )
+            lines.append(
+                f"前置计算: {self.prepare_cost * 1e3:.3f}ms, 超预算 {self.over_budget} 条"
+            )
+        return "\n".join(lines)
@@ -2,11 +2,25 @@
 
 import math
 import re
+from dataclasses import dataclass
 
-import jieba
+from .analysis import MessageAnalysis
 
-# 扩充jieba词典, 后续补充
-jieba.add_word("傻逼")
+
+@dataclass(slots=True, frozen=True)
+class SentimentScores:
+    """各类别语义可信度（0~0.99）"""
+
+    shut: float
+    """闭嘴"""
+    insult: float
+    """辱骂"""
+    bored: float
+    """无聊"""
+    ask: float
+    """提问"""
+    ai: float
+    """人机口吻"""
 
 
 class Sentiment:
@@ -211,100 +225,150 @@ class Sentiment:
     # 反问词表 - 可能改变语义
     RHETORICAL_WORDS = {"难道", "何必", "怎么可以", "怎么可能", "哪能", "岂能", "谁还"}
 
+    _PUNCT_RE = re.compile(r"[^\w\s]")
+
     @classmethod
-    def _seg(cls, text: str) -> list:
-        """分词并保留位置信息"""
-        text = re.sub(r"[^\w\s\u4e00-\u9fa5]", "", text.lower())
-        words = []
-        for word in jieba.lcut(text):
-            if word.strip() and word not in cls.STOP:
-                words.append(word)
-        return words
+    def _seg(cls, text: str | MessageAnalysis) -> list:
+        """
+        分词并保留位置信息
+        转小写后删除标点再分词（"傻。逼" 仍切出 "傻逼"），不做 NFKC；
+        无标点的消息与共享分词的输入相同，直接复用其结果
+        """
+        if isinstance(text, str):
+            text = MessageAnalysis(text)
+        return text.derive("sentiment_words", cls._words)
 
     @classmethod
-    def _calculate_confidence(cls, words: list, keyword_dict: dict) -> float:
-        """计算语义可信度"""
-        # 1. 基础匹配分数
-        base_score = 0
-        matched_keywords = []
+    def _words(cls, analysis: MessageAnalysis) -> list[str]:
+        text = cls._PUNCT_RE.sub("", analysis.text.lower())
+        stop = cls.STOP
+        return [t for t in analysis.tokens_of(text) if t not in stop]
 
-        # 检查反问表达
-        has_rhetorical = any(r_word in words for r_word in cls.RHETORICAL_WORDS)
+    # 打分类别（与 SentimentScores 字段一一对应）
+    CATEGORIES = ("shut", "insult", "bored", "ask", "ai")
 
-        for i, word in enumerate(words):
-            if word in keyword_dict:
-                weight, intensity = keyword_dict[word]
-
-                # 检查否定词
-                has_negation = any(
-                    neg_word in words[max(0, i - 3) : i]
-                    for neg_word in cls.NEGATION_WORDS
-                )
-
-                # 否定词降低权重
-                if has_negation:
-                    weight *= 0.3
-                    intensity *= 0.5
-                # 反问句可能反转语义
-                elif has_rhetorical:
-                    weight *= 0.7
-                    intensity *= 0.8
-
-                base_score += weight * intensity
-                matched_keywords.append(word)
-
-        # 2. 上下文增强分数
+    _INDEX: dict[str, tuple[tuple[int, float, float], ...]] | None = None
+
+    @classmethod
+    def _lexicon_index(cls) -> dict[str, tuple[tuple[int, float, float], ...]]:
+        """合并后的词典索引：词 -> ((类别, 权重, 强度), ...)，首次使用时构建"""
+        if cls._INDEX is None:
+            index: dict[str, list[tuple[int, float, float]]] = {}
+            lexicons = (
+                cls.SHUT_WORDS,
+                cls.INSULT_WORDS,
+                cls.BORED_WORDS,
+                cls.ASK_WORDS,
+                cls.AI_WORDS,
+            )
+            for cat, lexicon in enumerate(lexicons):
+                for word, (weight, intensity) in lexicon.items():
+                    index.setdefault(word, []).append((cat, weight, intensity))
+            cls._INDEX = {w: tuple(hits) for w, hits in index.items()}
+        return cls._INDEX
+
+    @staticmethod
+    def _confidence(base_score: float, matched: int, total: int) -> float:
+        """由基础分与命中数计算语义可信度"""
+        # 上下文增强分数
         context_score = 0
-        if matched_keywords:
+        if matched:
             # 关键词密度增强
-            density = len(matched_keywords) / len(words) if words else 0
+            density = matched / total if total else 0
             context_score += min(1.0, density * 5) * 0.5
 
             # 关键词组合增强
-            if len(matched_keywords) > 1:
-                context_score += min(1.0, (len(matched_keywords) - 1) * 0.4)
+            if matched > 1:
+                context_score += min(1.0, (matched - 1) * 0.4)
 
-        # 3. 总分数计算
+        # 总分数计算
         total_score = base_score + context_score
 
-        # 4. 应用Sigmoid函数转换为概率值
+        # 应用Sigmoid函数转换为概率值
         confidence = 1 / (1 + math.exp(-4 * (total_score - 1.5)))
 
-        # 5. 上限控制
+        # 上限控制
         return min(0.99, confidence)
 
+    @classmethod
+    def _score_words(cls, words: list) -> SentimentScores:
+        """单次正向扫描，同时计算全部类别的可信度"""
+        index = cls._lexicon_index()
+        negations = cls.NEGATION_WORDS
+        rhetoricals = cls.RHETORICAL_WORDS
+        n = len(cls.CATEGORIES)
+
+        # 无否定时分别累计“普通分”与“反问分”，扫描结束后按是否存在反问择一
+        plain_score = [0.0] * n
+        rhetorical_score = [0.0] * n
+        negated_score = [0.0] * n
+        matched = [0] * n
+        has_rhetorical = False
+        last_negation = -4
+
+        for i, word in enumerate(words):
+            hits = index.get(word)
+            if hits:
+                # 前 3 个词内出现否定词
+                has_negation = i - last_negation <= 3
+                for cat, weight, intensity in hits:
+                    matched[cat] += 1
+                    if has_negation:
+                        negated_score[cat] += (weight * 0.3) * (intensity * 0.5)
+                    else:
+                        plain_score[cat] += weight * intensity
+                        rhetorical_score[cat] += (weight * 0.7) * (intensity * 0.8)
+            if word in negations:
+                last_negation = i
+            if word in rhetoricals:
+                has_rhetorical = True
+
+        base = rhetorical_score if has_rhetorical else plain_score
+        total = len(words)
+        return SentimentScores(
+            *(
+                cls._confidence(base[c] + negated_score[c], matched[c], total)
+                for c in range(n)
+            )
+        )
+
+    @classmethod
+    def score_all(cls, text: str | MessageAnalysis) -> SentimentScores:
+        """
+        一次计算全部类别的可信度
+        传入 MessageAnalysis 时结果缓存在其上，同一条消息只打分一次
+        """
+        if isinstance(text, str):
+            return cls._score_words(cls._seg(text))
+        return text.derive("sentiment", lambda a: cls._score_words(cls._seg(a)))
+
     # 对外接口
     @classmethod
-    def shut(cls, text: str) -> float:
+    def shut(cls, text: str | MessageAnalysis) -> float:
         """判断是否要闭嘴"""
-        words = cls._seg(text)
-        return cls._calculate_confidence(words, cls.SHUT_WORDS)
+        return cls.score_all(text).shut
 
     @classmethod
-    def insult(cls, text: str) -> float:
+    def insult(cls, text: str | MessageAnalysis) -> float:
         """判断是否辱骂"""
-        words = cls._seg(text)
-        return cls._calculate_confidence(words, cls.INSULT_WORDS)
+        return cls.score_all(text).insult
 
     @classmethod
-    def bored(cls, text: str) -> float:
+    def bored(cls, text: str | MessageAnalysis) -> float:
         """判断是否无聊"""
-        words = cls._seg(text)
-        return cls._calculate_confidence(words, cls.BORED_WORDS)
+        return cls.score_all(text).bored
 
     @classmethod
-    def ask(cls, text: str) -> float:
+    def ask(cls, text: str | MessageAnalysis) -> float:
         """判断是否疑惑"""
-        words = cls._seg(text)
-        return cls._calculate_confidence(words, cls.ASK_WORDS)
+        return cls.score_all(text).ask
 
     @classmethod
-    def is_ai(cls, text: str) -> float:
+    def is_ai(cls, text: str | MessageAnalysis) -> float:
         """
         判断是否为AI口吻
         """
-        words = cls._seg(text)
-        return cls._calculate_confidence(words, cls.AI_WORDS)
+        return cls.score_all(text).ai
 
 
 # 全局单例
@@ -1,17 +1,188 @@
 # \astrbot\core\similarity.py
 
+import itertools
 import math
 import re
-from collections import defaultdict, deque
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict, deque
+from collections.abc import Iterable
 
-import jieba
+from .analysis import MessageAnalysis, nlp_ready
+from .model import BotMessageRecord
+
+
+class SparseVector:
+    """
+    稀疏向量：按 token id 升序排列的平行数组 + 预计算的模长
+    """
+
+    __slots__ = ("ids", "norm", "weights")
+
+    def __init__(self, ids: array, weights: array, norm: float):
+        self.ids = ids
+        self.weights = weights
+        self.norm = norm
+
+    def __bool__(self) -> bool:
+        return self.norm > 0
+
+    def dot(self, other: "SparseVector") -> float:
+        """归并求交计算点积"""
+        a_ids, a_w = self.ids, self.weights
+        b_ids, b_w = other.ids, other.weights
+        i = j = 0
+        la, lb = len(a_ids), len(b_ids)
+        total = 0.0
+        while i < la and j < lb:
+            x, y = a_ids[i], b_ids[j]
+            if x == y:
+                total += a_w[i] * b_w[j]
+                i += 1
+                j += 1
+            elif x < y:
+                i += 1
+            else:
+                j += 1
+        return total
+
+    def cosine(self, other: "SparseVector") -> float:
+        if not self or not other:
+            return 0.0
+        return self.dot(other) / (self.norm * other.norm)
+
+
+class GroupCorpus:
+    """
+    单个群的滑动窗口语料统计
+    - token 在群内驻留为整数 id，history 只保存每条消息的去重 id 数组
+    - df 随窗口增减，计数归零的 token 连同其 id 立即删除
+    """
+
+    __slots__ = (
+        "_next_id",
+        "df",
+        "history",
+        "ids",
+        "last_active",
+        "limit",
+        "names",
+        "size_version",
+        "stamp",
+        "version",
+    )
+
+    _VERSION = itertools.count(1)
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.history: deque[array] = deque()
+        self.ids: dict[str, int] = {}
+        """token -> id"""
+        self.names: dict[int, str] = {}
+        """id -> token"""
+        self.df: dict[int, int] = {}
+        """id -> 文档频率"""
+        self.stamp: dict[int, int] = {}
+        """id -> df 最近一次变化时的版本号"""
+        self.last_active = 0.0
+        self.version = next(self._VERSION)
+        """全局唯一的统计版本号，窗口变化后递增，用于失效向量缓存"""
+        self.size_version = self.version
+        """窗口文档数最近一次变化时的版本号"""
+        self._next_id = 0
+
+    @property
+    def total_docs(self) -> int:
+        return len(self.history)
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self.ids)
+
+    def _intern(self, token: str) -> int:
+        tid = self.ids.get(token)
+        if tid is None:
+            tid = self._next_id
+            self._next_id += 1
+            self.ids[token] = tid
+            self.names[tid] = token
+        return tid
+
+    def add(self, tokens: Iterable[str]) -> int:
+        """
+        追加一条消息，超出窗口的旧消息从 df 中扣除
+        :return: 词表大小的变化量
+        """
+        df, stamp = self.df, self.stamp
+        version = self.version = next(self._VERSION)
+        before = len(df)
+        if len(self.history) >= self.limit:
+            for tid in self.history.popleft():
+                c = df[tid] - 1
+                if c:
+                    df[tid] = c
+                    stamp[tid] = version
+                else:
+                    del df[tid], stamp[tid]
+                    del self.ids[self.names.pop(tid)]
+        else:
+            self.size_version = version
+        doc = array("I", sorted({self._intern(t) for t in tokens}))
+        self.history.append(doc)
+        for tid in doc:
+            df[tid] = df.get(tid, 0) + 1
+            stamp[tid] = version
+        return len(df) - before
+
+    def unchanged_since(
+        self, tf: dict[str, int], vec: SparseVector, version: int
+    ) -> bool:
+        """
+        自 version 以来，tf 中各 token 的 IDF 是否均未变化
+        （窗口大小未变、已知 token 的 df 未变、未知 token 仍未出现）
+        """
+        if self.size_version > version:
+            return False
+        get_id, stamp = self.ids.get, self.stamp
+        seen = 0
+        for t in tf:
+            tid = get_id(t)
+            if tid is not None:
+                if stamp[tid] > version:
+                    return False
+                seen += 1
+        return seen == len(vec.ids)
+
+    def vector(self, tf: dict[str, int]) -> SparseVector:
+        """按当前窗口的 IDF 构建 TF-IDF 稀疏向量"""
+        log_n1 = math.log((self.total_docs or 1) + 1) + 1
+        get_id, df, log = self.ids.get, self.df, math.log
+        pairs: list[tuple[int, float]] = []
+        # 窗口内未出现的 token 无法与用户消息相交，只计入模长
+        unseen = 0
+        for t, c in tf.items():
+            tid = get_id(t)
+            if tid is None:
+                unseen += c * c
+            else:
+                pairs.append((tid, c * (log_n1 - log(df[tid] + 1))))
+        pairs.sort()
+        weights = [w for _, w in pairs]
+        return SparseVector(
+            array("I", [tid for tid, _ in pairs]),
+            array("f", weights),
+            math.hypot(*weights, math.sqrt(unseen) * log_n1),
+        )
 
 
 class Similarity:
     """
     最终稳定版话题相关性检测
     - 群号隔离
-    - TF-IDF 稳定无膨胀
+    - TF-IDF 滑动窗口，旧消息出窗后扣减词频
+    - 群数据按 LRU / TTL / 词表预算淘汰
     - 内置 bot 消息预处理（去噪、去重、过滤模板）
     """
 
@@ -21,20 +192,28 @@ class Similarity:
         stopwords=None,
         bot_template_threshold: int = 2,
         early_stop: float = 0.92,
+        max_groups: int = 0,
+        group_ttl: float = 0,
+        vocab_budget: int = 0,
     ):
         """
         :param history_limit: 每个群最大历史窗口
         :param stopwords: 停用词
         :param bot_template_threshold: bot token 数 ≤ N 时视为模板句
         :param early_stop: 若相似度超该值，提前返回
+        :param max_groups: 最多保留多少个群的统计，0 表示不限
+        :param group_ttl: 群统计闲置多少秒后淘汰，0 表示不限
+        :param vocab_budget: 所有群词表大小之和的上限，0 表示不限
         """
-        self._GROUP_DATA = defaultdict(
-            lambda: {
-                "history": deque(maxlen=history_limit),
-                "idf": defaultdict(int),
-                "total_docs": 0,
-            }
-        )
+        self.history_limit = history_limit
+        self.max_groups = max_groups
+        self.group_ttl = group_ttl
+        self.vocab_budget = vocab_budget
+        self._GROUP_DATA: OrderedDict[str, GroupCorpus] = OrderedDict()
+        self._vocab_total = 0
+        self.evictions = 0
+        # 评分可能在线程池中并发执行，群统计的读写需串行
+        self._lock = threading.Lock()
 
         self.stopwords = stopwords or {
             "的",
@@ -63,10 +242,8 @@ class Similarity:
     # ---------------------------------------------------------
     # 分词
     # ---------------------------------------------------------
-    def _tokenize(self, text: str):
-        text = re.sub(r"[^\w\u4e00-\u9fa5]", " ", text)
-        tokens = jieba.lcut(text)
-        return [t for t in tokens if t not in self.stopwords and t.strip()]
+    def _tokenize(self, analysis: MessageAnalysis) -> list[str]:
+        return analysis.filtered(self.stopwords)
 
     # ---------------------------------------------------------
     # 噪音检测（表情、纯符号、纯引用等）
@@ -93,73 +270,143 @@ class Similarity:
         return False
 
     # ---------------------------------------------------------
-    # bot 消息预处理
+    # bot 消息预处理（发送时执行一次）
     # ---------------------------------------------------------
-    def _preprocess_bot_msgs(self, msgs: list[str]) -> list[str]:
-        cleaned = []
-        seen = set()
-
-        for m in msgs:
-            if not m:
-                continue
-
-            # 去重
-            if m in seen:
-                continue
-            seen.add(m)
-
-            # 噪音过滤
-            if self._is_noise_msg(m):
-                continue
-
+    def make_record(self, text: str) -> BotMessageRecord:
+        """预计算 bot 消息的特征，后续每条群消息只需查表"""
+        analysis = MessageAnalysis(text)
+        # 词典预热完成前不分词，该条记录只参与复读判定，不参与相关性计算
+        tokens = self._tokenize(analysis) if text and nlp_ready() else []
+        return BotMessageRecord(
+            text=text,
+            stripped=analysis.stripped,
+            tokens=tokens,
+            tf=dict(Counter(tokens)),
+            is_noise=self._is_noise_msg(text),
             # token 数过滤（模板句过滤）
-            tokens = self._tokenize(m)
-            if len(tokens) <= self.bot_template_threshold:
-                continue
-
-            cleaned.append(m)
+            is_template=len(tokens) <= self.bot_template_threshold,
+        )
 
-        return cleaned
+    @staticmethod
+    def _select_bot_records(
+        records: Iterable[BotMessageRecord],
+    ) -> list[BotMessageRecord]:
+        """去重、去噪、去模板句"""
+        selected = []
+        seen = set()
+        for r in records:
+            if not r.text or r.text in seen:
+                continue
+            seen.add(r.text)
+            if r.usable:
+                selected.append(r)
+        return selected
 
     # ---------------------------------------------------------
-    # TF-IDF 构建
+    # 群数据管理
     # ---------------------------------------------------------
-    def _update_idf(self, group_id: str, tokens: set):
-        data = self._GROUP_DATA[group_id]
-        for t in tokens:
-            data["idf"][t] += 1  # type: ignore
-        data["total_docs"] += 1  # type: ignore
-
-    def _tfidf_vector(self, group_id: str, tokens: list):
-        data = self._GROUP_DATA[group_id]
-        total_docs = data["total_docs"] or 1
-
-        tf = defaultdict(int)
-        for t in tokens:
-            tf[t] += 1
-
-        vec = {}
-        for t, c in tf.items():
-            idf = math.log((total_docs + 1) / (data["idf"][t] + 1)) + 1  # type: ignore
-            vec[t] = c * idf
-
-        return vec
+    def _group(self, group_id: str, now: float) -> GroupCorpus:
+        data = self._GROUP_DATA.get(group_id)
+        if data is None:
+            data = GroupCorpus(self.history_limit)
+            self._GROUP_DATA[group_id] = data
+        else:
+            self._GROUP_DATA.move_to_end(group_id)
+        data.last_active = now
+        return data
+
+    def _drop_group(self, group_id: str) -> None:
+        data = self._GROUP_DATA.pop(group_id, None)
+        if data is not None:
+            self._vocab_total -= data.vocab_size
+            self.evictions += 1
+
+    def _evict(self, now: float, keep: str) -> None:
+        """从最久未活跃的群开始淘汰，直到满足群数、TTL 与词表预算"""
+        while self._GROUP_DATA:
+            group_id, data = next(iter(self._GROUP_DATA.items()))
+            if group_id == keep:
+                break
+            over = (
+                (self.max_groups > 0 and len(self._GROUP_DATA) > self.max_groups)
+                or (self.vocab_budget > 0 and self._vocab_total > self.vocab_budget)
+                or (self.group_ttl > 0 and now - data.last_active > self.group_ttl)
+            )
+            if not over:
+                break
+            self._drop_group(group_id)
+
+    def vocab_size(self, group_id: str) -> int:
+        """当前群的词表大小"""
+        data = self._GROUP_DATA.get(group_id)
+        return data.vocab_size if data else 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            # 单群词表随 history_limit 增长，最大值用于判断窗口是否过大
+            vocab_max = max(
+                (data.vocab_size for data in self._GROUP_DATA.values()), default=0
+            )
+            return {
+                "groups": len(self._GROUP_DATA),
+                "vocab_total": self._vocab_total,
+                "vocab_max": vocab_max,
+                "evictions": self.evictions,
+            }
 
     # ---------------------------------------------------------
-    # Cosine
+    # 快照
     # ---------------------------------------------------------
-    def _cosine(self, v1, v2):
-        if not v1 or not v2:
-            return 0.0
-
-        dot = sum(v * v2.get(k, 0) for k, v in v1.items())
-        norm1 = math.sqrt(sum(v * v for v in v1.values()))
-        norm2 = math.sqrt(sum(v * v for v in v2.values()))
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+    def export_changed(
+        self, versions: dict[str, int]
+    ) -> tuple[dict[str, tuple[int, list[array], dict[int, str]]], list[str]]:
+        """
+        导出统计版本与 versions 不同的群
+        只做浅拷贝：history 中的 id 数组追加后不再修改，可以直接共享，
+        还原 token 与序列化交给调用方在线程中完成
+        :return: ({群号: (版本号, 窗口内各消息的 id 数组, id -> token)}, 当前全部群号)
+        """
+        changed: dict[str, tuple[int, list[array], dict[int, str]]] = {}
+        with self._lock:
+            for group_id, data in self._GROUP_DATA.items():
+                if versions.get(group_id) == data.version:
+                    continue
+                changed[group_id] = (
+                    data.version,
+                    list(data.history),
+                    data.names.copy(),
+                )
+            return changed, list(self._GROUP_DATA)
+
+    def restore(self, group_id: str, docs: Iterable[Iterable[str]]) -> int:
+        """按快照重建群的滑动窗口，返回重建后的统计版本号"""
+        with self._lock:
+            old = self._GROUP_DATA.pop(group_id, None)
+            if old is not None:
+                self._vocab_total -= old.vocab_size
+            data = self._group(group_id, time.monotonic())
+            for tokens in docs:
+                self._update_idf(data, tokens)
+            return data.version
 
-        return dot / (norm1 * norm2)
+    # ---------------------------------------------------------
+    # TF-IDF 构建
+    # ---------------------------------------------------------
+    def _update_idf(self, data: GroupCorpus, tokens: Iterable[str]):
+        self._vocab_total += data.add(tokens)
+
+    @staticmethod
+    def _record_vector(data: GroupCorpus, record: BotMessageRecord) -> SparseVector:
+        """bot 消息向量，统计窗口未变化时直接复用"""
+        cached = record.vector
+        if cached is not None and (
+            cached[0] == data.version
+            or data.unchanged_since(record.tf, cached[1], cached[0])
+        ):
+            return cached[1]
+        vec = data.vector(record.tf)
+        record.vector = (data.version, vec)
+        return vec
 
     # ---------------------------------------------------------
     # 主接口
@@ -167,8 +414,8 @@ class Similarity:
     def similarity(
         self,
         group_id: str,
-        user_msg: str,
-        bot_msgs: list[str],
+        user_msg: MessageAnalysis,
+        bot_msgs: Iterable[BotMessageRecord],
         update_history: bool = True,
     ) -> float:
         # 分词
@@ -176,27 +423,43 @@ class Similarity:
         if not user_tokens:
             return 0.0
 
+        with self._lock:
+            return self._similarity(group_id, user_tokens, bot_msgs, update_history)
+
+    def observe(self, group_id: str, user_msg: MessageAnalysis) -> None:
+        """只把消息计入群的滑动窗口统计，不计算相关性"""
+        user_tokens = self._tokenize(user_msg)
+        if not user_tokens:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._update_idf(self._group(group_id, now), user_tokens)
+            self._evict(now, keep=group_id)
+
+    def _similarity(
+        self,
+        group_id: str,
+        user_tokens: list[str],
+        bot_msgs: Iterable[BotMessageRecord],
+        update_history: bool,
+    ) -> float:
+        now = time.monotonic()
+        data = self._group(group_id, now)
+
         # 更新历史（可关闭）
         if update_history:
-            entry = " ".join(user_tokens)
-            self._GROUP_DATA[group_id]["history"].append(entry)  # type: ignore
-            self._update_idf(group_id, set(user_tokens))
+            self._update_idf(data, user_tokens)
+        self._evict(now, keep=group_id)
 
         # 用户向量
-        user_vec = self._tfidf_vector(group_id, user_tokens)
+        user_vec = data.vector(Counter(user_tokens))
 
-        # bot 消息预处理 + 最近优先
-        bot_list = self._preprocess_bot_msgs(bot_msgs)[::-1]
+        # bot 消息筛选 + 最近优先
+        bot_list = self._select_bot_records(bot_msgs)[::-1]
 
         best = 0.0
-        for bm in bot_list:
-            bm_tokens = self._tokenize(bm)
-            if not bm_tokens:
-                continue
-
-            bm_vec = self._tfidf_vector(group_id, bm_tokens)
-
-            sim = self._cosine(user_vec, bm_vec)
+        for record in bot_list:
+            sim = user_vec.cosine(self._record_vector(data, record))
             if sim > best:
                 best = sim
 
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from astrbot.api import logger
+
+from .backend import StateBackend
+from .model import GroupState, MemberState, StateManager
+
+if TYPE_CHECKING:
+    from .config import BackendConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    seq INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS groups (
+    gid TEXT PRIMARY KEY,
+    shutup_until REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    origin TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS groups_seq ON groups (seq);
+CREATE TABLE IF NOT EXISTS members (
+    gid TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    silence_until REAL NOT NULL,
+    last_wake REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    origin TEXT NOT NULL,
+    PRIMARY KEY (gid, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS members_seq ON members (seq);
+CREATE TABLE IF NOT EXISTS bot_msgs (
+    seq INTEGER NOT NULL,
+    gid TEXT NOT NULL,
+    ts REAL NOT NULL,
+    text TEXT NOT NULL,
+    origin TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bot_msgs_seq ON bot_msgs (seq);
+"""
+
+_UPSERT_GROUP = """
+INSERT INTO groups VALUES (?, ?, ?, ?)
+ON CONFLICT (gid) DO UPDATE SET
+    shutup_until = max(shutup_until, excluded.shutup_until),
+    seq = excluded.seq,
+    origin = excluded.origin
+"""
+
+_UPSERT_MEMBER = """
+INSERT INTO members VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (gid, uid) DO UPDATE SET
+    silence_until = max(silence_until, excluded.silence_until),
+    last_wake = max(last_wake, excluded.last_wake),
+    seq = excluded.seq,
+    origin = excluded.origin
+"""
+
+
+class _Batch:
+    """两次同步之间本进程的写入，同一个键只保留最新值"""
+
+    __slots__ = ("bot_msgs", "groups", "members")
+
+    def __init__(self):
+        self.groups: dict[str, float] = {}
+        self.members: dict[tuple[str, str], tuple[float, float]] = {}
+        self.bot_msgs: list[tuple[str, float, str]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.groups or self.members or self.bot_msgs)
+
+    def __len__(self) -> int:
+        return len(self.groups) + len(self.members) + len(self.bot_msgs)
+
+
+class _Changes:
+    """其他进程自上次同步以来的写入"""
+
+    __slots__ = ("bot_msgs", "groups", "members", "seq")
+
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.groups: list[tuple[str, float]] = []
+        self.members: list[tuple[str, str, float, float]] = []
+        self.bot_msgs: list[tuple[str, float, str]] = []
+
+
+class SqliteBackend(StateBackend):
+    """
+    本机多进程共享的 SQLite（WAL）状态后端
+
+    - 写入先合并进内存批次，由后台任务按同步间隔在一个事务内批量提交
+    - 每次提交递增全局序号；同步时按序号增量读取其他进程的写入，合并回本地状态
+    - 读到的共享状态同时保留在内存镜像中，新建群 / 成员时直接从镜像填充（读穿缓存）
+    - 时间戳类字段一律取较晚者合并，各进程以任意顺序同步都收敛到同一结果
+    - 数据库读写都在线程中执行，事件循环上只做内存操作
+    """
+
+    name = "sqlite"
+
+    BOT_MSG_KEEP = 5
+    """每个群镜像的 bot 消息条数，与 GroupState.bot_msgs 的长度一致"""
+    PRUNE_EVERY = 60.0
+    """清理过期行的间隔（秒）"""
+
+    def __init__(
+        self,
+        path: Path,
+        cfg: BackendConfig,
+        on_bot_msg: Callable[[GroupState, str], None],
+    ):
+        self.path = path
+        self.cfg = cfg
+        self.on_bot_msg = on_bot_msg
+        self.origin = uuid.uuid4().hex[:12]
+        """本进程的写入标记，同步时跳过自己发出的 bot 消息"""
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._batch = _Batch()
+        self._seq = 0
+        """已合并到的全局序号"""
+        self._last_prune = 0.0
+        # 内存镜像（读穿缓存）
+        self._groups: dict[str, float] = {}
+        self._members: dict[tuple[str, str], tuple[float, float]] = {}
+        self._bot_msgs: dict[str, deque[tuple[float, str]]] = {}
+        self.syncs = 0
+        self.rows_written = 0
+        self.rows_applied = 0
+        self.errors = 0
+        self.last_sync_ms = 0.0
+
+    # ---------------------------------------------------------
+    # StateBackend
+    # ---------------------------------------------------------
+    def load_group(self, group: GroupState) -> None:
+        shutup_until = self._groups.get(group.gid)
+        if shutup_until:
+            StateManager.merge_group(group, shutup_until)
+        for _, text in self._bot_msgs.get(group.gid, ()):
+            self.on_bot_msg(group, text)
+
+    def load_member(self, group: GroupState, member: MemberState) -> None:
+        shared = self._members.get((group.gid, member.uid))
+        if shared:
+            StateManager.merge_member(group, member, *shared)
+
+    def publish_group(self, group: GroupState) -> None:
+        self._batch.groups[group.gid] = group.shutup_until
+        self._groups[group.gid] = group.shutup_until
+
+    def publish_member(self, group: GroupState, member: MemberState) -> None:
+        row = (member.silence_until, member.last_wake)
+        self._batch.members[(group.gid, member.uid)] = row
+        self._members[(group.gid, member.uid)] = row
+
+    def publish_bot_msg(self, group: GroupState, text: str, now: float) -> None:
+        self._batch.bot_msgs.append((group.gid, now, text))
+        self._mirror_bot_msg(group.gid, now, text)
+
+    async def start(self) -> None:
+        # 首次同步读取已有的全部共享状态
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"共享状态后端已启动：{self.path}，已载入 {len(self._groups)} 个群、"
+            f"{len(self._members)} 个成员的共享状态"
+        )
+
+    async def close(self) -> None:
+        if self._task:
+            # 等正在进行的同步结束后再取消，避免已提交的批次被当作失败重放
+            async with self._lock:
+                self._task.cancel()
+            self._task = None
+        try:
+            await self.sync()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"共享状态最后一次同步失败: {e}")
+        finally:
+            async with self._lock:
+                await asyncio.to_thread(self._close)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "syncs": self.syncs,
+            "rows_written": self.rows_written,
+            "rows_applied": self.rows_applied,
+            "pending_writes": len(self._batch),
+            "errors": self.errors,
+            "last_sync_ms": round(self.last_sync_ms, 3),
+        }
+
+    # ---------------------------------------------------------
+    # 同步
+    # ---------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            interval = self.cfg.sync_interval
+            await asyncio.sleep(interval if interval > 0 else 1.0)
+            try:
+                await self.sync()
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                logger.warning(f"共享状态同步失败: {e}")
+
+    async def sync(self) -> None:
+        """提交本进程的批次，并合并其他进程的新写入"""
+        async with self._lock:
+            start = time.perf_counter()
+            batch, self._batch = self._batch, _Batch()
+            now = time.time()
+            prune_before = 0.0
+            if now - self._last_prune >= self.PRUNE_EVERY:
+                prune_before = now - self.cfg.retention
+            try:
+                changes = await asyncio.to_thread(
+                    self._sync_db, batch, self._seq, prune_before
+                )
+            except (sqlite3.Error, OSError):
+                # 提交失败：把批次放回，下一次同步重试（期间的新写入优先）
+                self._requeue(batch)
+                raise
+            if prune_before:
+                self._last_prune = now
+                self._prune_mirror(prune_before)
+            self.rows_written += len(batch)
+            self._apply(changes)
+            self.syncs += 1
+            self.last_sync_ms = (time.perf_counter() - start) * 1000
+
+    def _requeue(self, batch: _Batch) -> None:
+        for gid, value in batch.groups.items():
+            self._batch.groups.setdefault(gid, value)
+        for key, row in batch.members.items():
+            self._batch.members.setdefault(key, row)
+        self._batch.bot_msgs[:0] = batch.bot_msgs
+
+    def _apply(self, changes: _Changes) -> None:
+        groups = StateManager._groups
+        for gid, shutup_until in changes.groups:
+            if shutup_until > self._groups.get(gid, 0.0):
+                self._groups[gid] = shutup_until
+            group = groups.get(gid)
+            if group is not None:
+                StateManager.merge_group(group, shutup_until)
+        for gid, uid, silence_until, last_wake in changes.members:
+            key = (gid, uid)
+            old = self._members.get(key, (0.0, 0.0))
+            self._members[key] = (max(old[0], silence_until), max(old[1], last_wake))
+            group = groups.get(gid)
+            member = group.members.get(uid) if group is not None else None
+            if group is not None and member is not None:
+                StateManager.merge_member(group, member, silence_until, last_wake)
+        for gid, ts, text in changes.bot_msgs:
+            self._mirror_bot_msg(gid, ts, text)
+            group = groups.get(gid)
+            if group is not None:
+                self.on_bot_msg(group, text)
+        self.rows_applied += (
+            len(changes.groups) + len(changes.members) + len(changes.bot_msgs)
+        )
+        self._seq = changes.seq
+
+    def _mirror_bot_msg(self, gid: str, ts: float, text: str) -> None:
+        msgs = self._bot_msgs.get(gid)
+        if msgs is None:
+            msgs = self._bot_msgs[gid] = deque(maxlen=self.BOT_MSG_KEEP)
+        msgs.append((ts, text))
+
+    def _prune_mirror(self, before: float) -> None:
+        self._groups = {g: t for g, t in self._groups.items() if t >= before}
+        self._members = {
+            k: row for k, row in self._members.items() if max(row) >= before
+        }
+        self._bot_msgs = {g: m for g, m in self._bot_msgs.items() if m[-1][0] >= before}
+
+    # ---------------------------------------------------------
+    # 数据库（仅在线程中调用）
+    # ---------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, timeout=10
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for stmt in _SCHEMA.split(";"):
+                    if stmt.strip():
+                        conn.execute(stmt)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _sync_db(self, batch: _Batch, since: int, prune_before: float) -> _Changes:
+        with self._db_lock:
+            conn = self._connect()
+            if batch or prune_before:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._write(conn, batch, prune_before)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            return self._read(conn, since)
+
+    def _write(self, conn: sqlite3.Connection, batch: _Batch, prune_before: float):
+        conn.execute("UPDATE meta SET seq = seq + 1 WHERE id = 0")
+        (seq,) = conn.execute("SELECT seq FROM meta WHERE id = 0").fetchone()
+        origin = self.origin
+        conn.executemany(
+            _UPSERT_GROUP,
+            [(gid, value, seq, origin) for gid, value in batch.groups.items()],
+        )
+        conn.executemany(
+            _UPSERT_MEMBER,
+            [(*key, *row, seq, origin) for key, row in batch.members.items()],
+        )
+        conn.executemany(
+            "INSERT INTO bot_msgs VALUES (?, ?, ?, ?, ?)",
+            [(seq, gid, ts, text, origin) for gid, ts, text in batch.bot_msgs],
+        )
+        if prune_before:
+            conn.execute("DELETE FROM groups WHERE shutup_until < ?", (prune_before,))
+            conn.execute(
+                "DELETE FROM members WHERE max(silence_until, last_wake) < ?",
+                (prune_before,),
+            )
+            conn.execute("DELETE FROM bot_msgs WHERE ts < ?", (prune_before,))
+
+    def _read(self, conn: sqlite3.Connection, since: int) -> _Changes:
+        conn.execute("BEGIN")
+        try:
+            (seq,) = conn.execute("SELECT seq FROM meta WHERE id = 0").fetchone()
+            changes = _Changes(seq)
+            if seq > since:
+                # 群 / 成员行按较晚者合并，最后写入者未必是胜出值的来源，
+                # 因此不按 origin 过滤；重复合并自己的写入是幂等的
+                changes.groups = conn.execute(
+                    "SELECT gid, shutup_until FROM groups WHERE seq > ? AND seq <= ?",
+                    (since, seq),
+                ).fetchall()
+                changes.members = conn.execute(
+                    "SELECT gid, uid, silence_until, last_wake FROM members"
+                    " WHERE seq > ? AND seq <= ?",
+                    (since, seq),
+                ).fetchall()
+                # 本地镜像和群状态都只保留每群最近 BOT_MSG_KEEP 条，
+                # 更早的消息应用后也会被挤掉，首次同步时尤其不必逐条分词；
+                # 同一批次的 seq 相同，先后顺序以插入顺序（rowid）为准
+                changes.bot_msgs = conn.execute(
+                    "SELECT gid, ts, text FROM ("
+                    " SELECT gid, ts, text, rowid AS id, row_number() OVER"
+                    " (PARTITION BY gid ORDER BY rowid DESC) AS n FROM bot_msgs"
+                    " WHERE seq > ? AND seq <= ? AND origin != ?"
+                    ") WHERE n <= ? ORDER BY id",
+                    (since, seq, self.origin, self.BOT_MSG_KEEP),
+                ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return changes
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable
+from typing import ClassVar
 
 from ..config import PluginConfig
 from ..model import StepName, StepResult, WakeContext
@@ -13,20 +15,27 @@ class BaseStep(ABC):
     #: 步骤名（必须覆盖）
     name: StepName
 
+    #: 原因码 -> 说明模板（str.format，参数取自 StepResult.args）
+    MESSAGES: ClassVar[dict[str, str]] = {}
+
     def __init__(self, config: PluginConfig):
         self.config = config
 
     @abstractmethod
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult | Awaitable[StepResult]:
         """
         处理单次步骤的核心逻辑。
+
+        不需要等待任何东西的步骤直接定义为普通方法并返回 StepResult，
+        流水线会同步调用，省去协程对象的创建与调度；
+        确实需要 await 的步骤定义为 async def，或仅在需要等待的分支返回协程。
         参数
         ----
         ctx : WakeContext
             上游传递的上下文对象，只读，不应在此方法内直接替换。
         返回
         ----
-        StepResult
+        StepResult 或其 awaitable
             用于指示当前步骤的处理结果和后续调度行为的枚举/数据结构。
             典型约定包括：
             - wake: True 表示唤醒, False 表示阻塞, None 表示跳过；
@@ -38,5 +47,14 @@ class BaseStep(ABC):
         """
         ...  # 子类必须覆盖此处
 
+    def describe(self, result: StepResult) -> str | None:
+        """结果的可读说明，只在输出日志或追踪时调用"""
+        if result.msg:
+            return result.msg
+        template = self.MESSAGES.get(result.reason or "")
+        if template is None:
+            return result.reason
+        return template.format(*result.args) if result.args else template
+
     async def initialize(self) -> None: ...
     async def terminate(self) -> None: ...
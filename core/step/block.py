@@ -1,4 +1,4 @@
-import re
+from typing import ClassVar
 
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
@@ -21,6 +21,13 @@ BOT_RANGES: list[tuple[int, int]] = [
 class BlockStep(BaseStep):
     name = StepName.BLOCK
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "wake_cd": "唤醒冷却中({}秒)，已阻止唤醒",
+        "qqbot": "过滤QQ机器人",
+        "reread": "已阻止复读: {}",
+        "keyword": "包含违禁词: {}",
+    }
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.block
@@ -43,7 +50,7 @@ class BlockStep(BaseStep):
                 return True
         return False
 
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult:
         # 唤醒CD阻塞
         if (
             not ctx.debounce_follow_up
@@ -54,7 +61,8 @@ class BlockStep(BaseStep):
             return StepResult(
                 wake=False,
                 abort=True,
-                msg=f"唤醒冷却中({self.cfg.wake_cd}秒)，已阻止唤醒",
+                reason="wake_cd",
+                args=(self.cfg.wake_cd,),
             )
         # 过滤QQ机器人
         if (
@@ -62,20 +70,22 @@ class BlockStep(BaseStep):
             and isinstance(ctx.event, AiocqhttpMessageEvent)
             and self._is_qqbot(ctx.uid)
         ):
-            return StepResult(wake=False, abort=True, msg="过滤QQ机器人")
+            return StepResult(wake=False, abort=True, reason="qqbot")
         # 复读阻塞
         if self.cfg.reread and ctx.plain and ctx.group:
-            cleaned = re.sub(r"[^\w\u4e00-\u9fff]", "", ctx.plain).lower()
-            for msg in ctx.group.bot_msgs:
-                if not msg:
-                    continue
-                m = re.sub(r"[^\w\u4e00-\u9fff]", "", msg).lower()
-                if cleaned == m:
-                    return StepResult(wake=False, abort=True, msg=f"已阻止复读: {msg}")
+            cleaned = ctx.analysis.stripped
+            for record in ctx.group.bot_msgs:
+                if record.text and cleaned == record.stripped:
+                    return StepResult(
+                        wake=False,
+                        abort=True,
+                        reason="reread",
+                        args=(record.text,),
+                    )
 
         # 违禁词阻塞
         if self.cfg.keywords and ctx.plain:
-            for w in self.cfg.keywords:
-                if w in ctx.plain:
-                    return StepResult(wake=False, abort=True, msg=f"包含违禁词: {w}")
+            w = self.cfg.keyword_matcher.search(ctx.plain)
+            if w is not None:
+                return StepResult(wake=False, abort=True, reason="keyword", args=(w,))
         return StepResult()
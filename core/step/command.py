@@ -1,3 +1,5 @@
+from typing import ClassVar
+
 from astrbot.core.message.components import Plain
 
 from ..config import PluginConfig
@@ -8,30 +10,46 @@ from .base import BaseStep
 class CommandStep(BaseStep):
     name = StepName.COMMAND
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "debounce_follow_up": "消息防抖窗口内，跳过指令判定",
+        "builtin_cmd": "命令 '{}' 已被禁用",
+        "prefix_cmd": "前缀触发的指令 '{}' 已被禁用",
+        "prefix_llm": "前缀触发的LLM已被禁用",
+        "prefix_wake": "前缀（{}）唤醒",
+    }
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.command
         self.wake_prefix = config.wake_prefix
 
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult:
         if ctx.debounce_follow_up:
-            return StepResult(msg="消息防抖窗口内，跳过指令判定")
+            return StepResult(reason="debounce_follow_up")
 
         if self.cfg.block_builtin and ctx.cmd and ctx.cmd in self.cfg.builtin_cmds:
-            return StepResult(wake=False, abort=True, msg=f"命令 '{ctx.cmd}' 已被禁用")
+            return StepResult(
+                wake=False,
+                abort=True,
+                reason="builtin_cmd",
+                args=(ctx.cmd,),
+            )
 
         seg = ctx.chain[0] if ctx.chain and isinstance(ctx.chain[0], Plain) else None
         if seg and any(seg.text.startswith(p) for p in self.wake_prefix):
             # 屏蔽前缀触发指令
             if ctx.cmd and self.cfg.block_prefix_cmd:
                 return StepResult(
-                    wake=False, abort=True, msg=f"前缀触发的指令 '{ctx.cmd}' 已被禁用"
+                    wake=False,
+                    abort=True,
+                    reason="prefix_cmd",
+                    args=(ctx.cmd,),
                 )
             # 屏蔽前缀触发LLM
             if not ctx.cmd and self.cfg.block_prefix_llm:
-                return StepResult(wake=False, abort=True, msg="前缀触发的LLM已被禁用")
+                return StepResult(wake=False, abort=True, reason="prefix_llm")
             # 前缀唤醒
             if ctx.cmd:
-                return StepResult(wake=True, msg=f"前缀（{ctx.cmd}）唤醒")
+                return StepResult(wake=True, reason="prefix_wake", args=(ctx.cmd,))
 
         return StepResult()
@@ -1,29 +1,46 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import ClassVar
 from urllib.parse import urlparse
 
 from astrbot.core.message.components import (
     At,
     BaseMessageComponent,
     Image,
-    Plain,
     Reply,
 )
 from astrbot.core.pipeline.process_stage import follow_up as process_follow_up
 
 from ..config import PluginConfig
-from ..model import PendingWakeRequest, StateManager, StepName, StepResult, WakeContext
+from ..metrics import metrics
+from ..model import (
+    MergeBuffer,
+    PendingWakeRequest,
+    StateManager,
+    StepName,
+    StepResult,
+    WakeContext,
+)
 from .base import BaseStep
 
 
 class DebounceStep(BaseStep):
     name = StepName.DEBOUNCE
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "gif": "检测到 GIF，跳过消息合并",
+        "merged": "已合并同用户 {} 条连续消息",
+        "merged_limit": "已合并同用户 {} 条连续消息，达到上限后立即发起请求",
+    }
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.debounce
 
+    async def terminate(self) -> None:
+        StateManager.stop_pending_expiry()
+
     async def handle(self, ctx: WakeContext) -> StepResult:
         if self.cfg.listen_seconds <= 0:
             return StepResult()
@@ -40,41 +57,36 @@ class DebounceStep(BaseStep):
 
         if not pending:
             return StepResult()
-        if self._contains_gif(pending.chain) or self._contains_gif(ctx.chain):
-            return StepResult(msg="检测到 GIF，跳过消息合并")
+        # GIF 消息不会进入缓冲区，只需检查当前消息
+        if self._contains_gif(ctx.chain):
+            return StepResult(reason="gif")
 
         self._stop_previous_event(pending.event)
         ctx.debounce_follow_up = True
         self._detach_active_runner(ctx.umo)
-        ctx.chain = self._merge_chain(pending.chain, ctx.chain)
-        ctx.plain = self._merge_plain(pending.plain, ctx.plain)
+        buffer = pending.buffer
+        buffer.append(ctx.chain, ctx.plain)
+        ctx.debounce_buffer = buffer
+        ctx.chain, ctx.plain = buffer.build()
         self._apply_merged_message(ctx)
 
         merged_count = pending.merged_count + 1
         ctx.debounce_merged_count = merged_count
-        if self._should_continue_listening(merged_count):
-            await StateManager.register_pending_request(
-                key,
-                PendingWakeRequest(
-                    event=ctx.event,
-                    chain=list(ctx.chain),
-                    plain=ctx.plain,
-                    created_at=ctx.now,
-                    merged_count=merged_count,
-                ),
-                window=self.cfg.listen_seconds,
-            )
-            msg = f"已合并同用户 {merged_count} 条连续消息"
-        else:
-            msg = f"已合并同用户 {merged_count} 条连续消息，达到上限后立即发起请求"
-        return StepResult(wake=True, msg=msg)
+        # 继续监听时由唤醒后的 activate_window 沿用同一个缓冲区重新挂起
+        reason = (
+            "merged"
+            if self._should_continue_listening(merged_count)
+            else "merged_limit"
+        )
+        metrics.inc("debounce_merges")
+        return StepResult(wake=True, reason=reason, args=(merged_count,))
 
     async def activate_window(self, ctx: WakeContext) -> None:
         if self.cfg.listen_seconds <= 0 or not ctx.uid:
             return
-        if self._contains_gif(ctx.chain):
-            return
         if not ctx.debounce_follow_up:
+            if self._contains_gif(ctx.chain):
+                return
             message_type = self._detect_message_type(ctx)
             if message_type not in self.cfg.message_types:
                 return
@@ -86,8 +98,7 @@ class DebounceStep(BaseStep):
             key,
             PendingWakeRequest(
                 event=ctx.event,
-                chain=list(ctx.chain),
-                plain=ctx.plain,
+                buffer=ctx.debounce_buffer or MergeBuffer(ctx.chain, ctx.plain),
                 created_at=ctx.now,
                 merged_count=ctx.debounce_merged_count,
             ),
@@ -122,26 +133,8 @@ class DebounceStep(BaseStep):
         max_merge_count = int(self.cfg.max_merge_count)
         return max_merge_count <= 0 or merged_count < max_merge_count
 
-    @staticmethod
-    def _merge_plain(previous_plain: str, current_plain: str) -> str:
-        parts = [
-            part.strip() for part in (previous_plain, current_plain) if part.strip()
-        ]
-        return "\n".join(parts)
-
-    def _merge_chain(
-        self,
-        previous_chain: list[BaseMessageComponent],
-        current_chain: list[BaseMessageComponent],
-    ) -> list[BaseMessageComponent]:
-        merged = list(previous_chain)
-        if merged and current_chain:
-            merged.append(Plain("\n", convert=False))
-        merged.extend(current_chain)
-        return merged
-
     def _apply_merged_message(self, ctx: WakeContext) -> None:
-        ctx.event.message_obj.message = list(ctx.chain)
+        ctx.event.message_obj.message = ctx.chain
         ctx.event.message_obj.message_str = ctx.plain
         ctx.event.message_str = ctx.plain
 
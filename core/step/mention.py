@@ -1,3 +1,5 @@
+from typing import ClassVar
+
 from astrbot.core.message.components import At, Reply
 
 from ..config import PluginConfig
@@ -8,16 +10,27 @@ from .base import BaseStep
 class MentionStep(BaseStep):
     name = StepName.MENTION
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "debounce_follow_up": "消息防抖窗口内，沿用已唤醒状态",
+        "command": "指令消息，跳过提及唤醒",
+        "at": "艾特唤醒",
+        "reply": "引用唤醒",
+        "reply_other": "引用了别人的消息，已跳过唤醒",
+        "at_other": "艾特了别人，已跳过唤醒",
+        "name": "通用唤醒词唤醒",
+        "admin_name": "专属唤醒词唤醒",
+    }
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.mention
 
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult:
         if ctx.debounce_follow_up:
-            return StepResult(msg="消息防抖窗口内，沿用已唤醒状态")
+            return StepResult(reason="debounce_follow_up")
 
         if ctx.cmd:
-            return StepResult(msg="指令消息，跳过提及唤醒")
+            return StepResult(reason="command")
 
         has_self_reference = False
         has_other_reply = False
@@ -37,35 +50,31 @@ class MentionStep(BaseStep):
         if has_self_reference:
             for seg in ctx.chain:
                 if isinstance(seg, At) and str(seg.qq) == ctx.bid:
-                    return StepResult(wake=True, msg="艾特唤醒", prolong=True)
+                    return StepResult(wake=True, reason="at", prolong=True)
                 if (
                     not self.cfg.disable_reply_wake
                     and isinstance(seg, Reply)
                     and str(seg.sender_id) == ctx.bid
                 ):
-                    return StepResult(wake=True, msg="引用唤醒", prolong=True)
+                    return StepResult(wake=True, reason="reply", prolong=True)
 
         if (
             self.cfg.disable_reply_other_wake
             and has_other_reply
             and not has_self_reference
         ):
-            return StepResult(
-                wake=False, abort=True, msg="引用了别人的消息，已跳过唤醒"
-            )
+            return StepResult(wake=False, abort=True, reason="reply_other")
         if self.cfg.disable_at_other_wake and has_other_at and not has_self_reference:
-            return StepResult(
-                wake=False, abort=True, msg="艾特了别人，已跳过唤醒"
-            )
+            return StepResult(wake=False, abort=True, reason="at_other")
 
         if ctx.plain:
             for name in self.cfg.names:
                 if name and name in ctx.plain:
-                    return StepResult(wake=True, msg="通用唤醒词唤醒", prolong=True)
+                    return StepResult(wake=True, reason="name", prolong=True)
 
             if ctx.is_admin:
                 for name in self.cfg.admin_names:
                     if name and name in ctx.plain:
-                        return StepResult(wake=True, msg="专属唤醒词唤醒", prolong=True)
+                        return StepResult(wake=True, reason="admin_name", prolong=True)
 
         return StepResult()
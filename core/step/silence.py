@@ -1,40 +1,77 @@
+import asyncio
+from collections.abc import Awaitable
+from typing import ClassVar
+
+from ..analysis import nlp_ready
 from ..config import PluginConfig
-from ..model import StepName, StepResult, WakeContext
-from ..sentiment import sentiment
+from ..executor import scoring
+from ..metrics import metrics
+from ..model import StateManager, StepName, StepResult, WakeContext
+from ..sentiment import SentimentScores, sentiment
 from .base import BaseStep
 
 
 class SilenceStep(BaseStep):
     name = StepName.SILENCE
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "scoring_timeout": "情感评分超时，本条消息不做沉默判定",
+        "shutup": "触发群聊级闭嘴({}秒)",
+        "insult": "触发用户级闭嘴({}秒)",
+        "ai": "触发人机级闭嘴({}秒)",
+    }
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.silence
 
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult | Awaitable[StepResult]:
+        """只有评分卸载到线程池时才返回协程，其余情况同步返回"""
         # 前置条件：bot 已被唤醒
         if not ctx.event.is_at_or_wake_command:
             return StepResult()
+        # 情感信号需要分词，词典预热完成前跳过
+        if not ctx.plain or not nlp_ready():
+            return StepResult()
+        if not (
+            (self.cfg.shutup < 1 and ctx.group)
+            or ((self.cfg.insult < 1 or self.cfg.ai < 1) and ctx.member)
+        ):
+            return StepResult()
+        if scoring.enabled:
+            return self._score_offloaded(ctx)
+        return self._judge(ctx, sentiment.score_all(ctx.analysis))
+
+    async def _score_offloaded(self, ctx: WakeContext) -> StepResult:
+        try:
+            scores = await scoring.run(sentiment.score_all, ctx.analysis)
+        except asyncio.TimeoutError:  # noqa: UP041
+            return StepResult(reason="scoring_timeout")
+        return self._judge(ctx, scores)
 
+    def _judge(self, ctx: WakeContext, scores: SentimentScores) -> StepResult:
         # 闭嘴沉默
-        if self.cfg.shutup < 1 and ctx.plain and ctx.group:
-            th = sentiment.shut(ctx.plain)
+        if self.cfg.shutup < 1 and ctx.group:
+            th = scores.shut
             if th > self.cfg.shutup:
                 seconds = self.cfg.multiple * th
-                ctx.group.shutup_until = ctx.now + seconds
-                return StepResult(abort=True, msg=f"触发群聊级闭嘴({seconds}秒)")
+                StateManager.shutup_group(ctx.group, ctx.now + seconds)
+                metrics.inc("silence_triggers", "shutup")
+                return StepResult(abort=True, reason="shutup", args=(seconds,))
         # 辱骂沉默
-        if self.cfg.insult < 1 and ctx.plain and ctx.member:
-            th = sentiment.insult(ctx.plain)
+        if self.cfg.insult < 1 and ctx.group and ctx.member:
+            th = scores.insult
             if th > self.cfg.insult:
                 seconds = th * self.cfg.multiple
-                ctx.member.silence_until = ctx.now + seconds
-                return StepResult(abort=True, msg=f"触发用户级闭嘴({seconds}秒)")
+                StateManager.silence_member(ctx.group, ctx.member, ctx.now + seconds)
+                metrics.inc("silence_triggers", "insult")
+                return StepResult(abort=True, reason="insult", args=(seconds,))
         # 人机沉默
-        if self.cfg.ai < 1 and ctx.plain and ctx.member:
-            th = sentiment.is_ai(ctx.plain)
+        if self.cfg.ai < 1 and ctx.group and ctx.member:
+            th = scores.ai
             if th > self.cfg.ai:
                 seconds = th * self.cfg.multiple
-                ctx.member.silence_until = ctx.now + seconds
-                return StepResult(abort=True, msg=f"触发人机级闭嘴({seconds}秒)")
+                StateManager.silence_member(ctx.group, ctx.member, ctx.now + seconds)
+                metrics.inc("silence_triggers", "ai")
+                return StepResult(abort=True, reason="ai", args=(seconds,))
         return StepResult()
@@ -1,8 +1,16 @@
+import asyncio
 import random
+from collections.abc import Awaitable, Callable
+from typing import ClassVar
 
+from astrbot.api import logger
+
+from ..analysis import nlp_ready, warmup
 from ..config import PluginConfig
+from ..executor import scoring
 from ..interest import Interest
-from ..model import StepName, StepResult, WakeContext
+from ..model import BotMessageRecord, StepName, StepResult, WakeContext
+from ..scheduler import ScheduleResult, Signal, SignalScheduler
 from ..sentiment import sentiment
 from ..similarity import Similarity
 from .base import BaseStep
@@ -11,25 +19,61 @@ from .base import BaseStep
 class WakeStep(BaseStep):
     name = StepName.WAKE
 
+    MESSAGES: ClassVar[dict[str, str]] = {
+        "debounce_follow_up": "消息防抖窗口内，沿用已唤醒状态",
+        "group_silenced": "已沉默该群聊，禁止唤醒",
+        "member_silenced": "已沉默该用户，禁止唤醒",
+        "command": "指令消息，跳过智能唤醒",
+        "prolong": "唤醒延长",
+        "degraded": "群聊消息过密，降级模式下跳过主动唤醒",
+        "scoring_timeout": "智能唤醒评分超时，本条消息不主动唤醒",
+        "over_budget": "唤醒信号超出单条消息预算，跳过剩余信号",
+        # 信号命中时原因码即信号名
+        "similar": "相关性唤醒",
+        "ask": "答疑唤醒",
+        "bored": "无聊唤醒",
+        "interest": "兴趣唤醒",
+        "prob": "概率唤醒",
+    }
+    REPORT_EVERY = 1000
+    """每评估多少条消息输出一次信号统计"""
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.wake
         self.interest = Interest(self.cfg._interest_words)
-        self.similarity = Similarity()
+        mem = config.memory
+        self.similarity = Similarity(
+            max_groups=mem.similarity_max_groups,
+            group_ttl=mem.similarity_group_ttl,
+            vocab_budget=mem.similarity_vocab_budget,
+        )
+        self.scheduler = SignalScheduler()
+        self._evaluated = 0
+
+    async def initialize(self) -> None:
+        # 后台预热 jieba 词典，避免首条群消息在事件循环上同步加载
+        if warmup(self._on_warmup_done):
+            logger.debug("jieba 词典开始后台预热")
+
+    @staticmethod
+    def _on_warmup_done(seconds: float) -> None:
+        logger.info(f"jieba 词典预热完成，耗时 {seconds:.2f} 秒")
 
-    async def handle(self, ctx: WakeContext) -> StepResult:
+    def handle(self, ctx: WakeContext) -> StepResult | Awaitable[StepResult]:
+        """只有评分卸载到线程池时才返回协程，其余情况同步返回"""
         if ctx.debounce_follow_up:
-            return StepResult(msg="消息防抖窗口内，沿用已唤醒状态")
+            return StepResult(reason="debounce_follow_up")
 
         # 前置条件：已沉默，禁止一切唤醒
         if ctx.group and ctx.group.shutup_until > ctx.now:
-            return StepResult(wake=False, abort=True, msg="已沉默该群聊，禁止唤醒")
+            return StepResult(wake=False, abort=True, reason="group_silenced")
         if ctx.member and ctx.member.silence_until > ctx.now:
-            return StepResult(wake=False, abort=True, msg="已沉默该用户，禁止唤醒")
+            return StepResult(wake=False, abort=True, reason="member_silenced")
 
         # 跳过指令消息
         if ctx.cmd:
-            return StepResult(msg="指令消息，跳过智能唤醒")
+            return StepResult(reason="command")
         # 唤醒延长
         if (
             self.cfg.prolong > 0
@@ -37,32 +81,114 @@ class WakeStep(BaseStep):
             and ctx.member.can_prolong
             and ctx.now - ctx.member.last_reply <= self.cfg.prolong
         ):
-            return StepResult(wake=True, msg="唤醒延长", prolong=True)
-        # 相关性唤醒
-        if self.cfg.similar < 1 and ctx.group and ctx.group.bot_msgs and ctx.plain:
-            sim = self.similarity.similarity(
-                ctx.gid, ctx.plain, list(ctx.group.bot_msgs)
+            return StepResult(wake=True, reason="prolong", prolong=True)
+        # 降级模式：群聊刷屏时主动唤醒没有意义，跳过其余信号
+        if ctx.degraded:
+            return StepResult(reason="degraded")
+        # 其余信号互相独立，交给调度器按实测耗时从低到高求值
+        # NLP 信号需要分词，词典预热完成前跳过，不在事件循环上等待
+        nlp = bool(ctx.plain) and nlp_ready()
+        # bot 消息队列在事件循环上持续追加，交给评分线程前先取快照
+        bot_msgs = list(ctx.group.bot_msgs) if nlp and ctx.group else []
+        signals = self._signals(ctx, bot_msgs, nlp)
+        if not signals:
+            return StepResult()
+        budget = self.config.perf.signal_budget_ms / 1000
+        if not nlp:
+            return self._conclude(self.scheduler.run(signals, budget))
+
+        def prepare() -> object:
+            return ctx.analysis.tokens
+
+        # 答疑与无聊共用一次情感打分（结果缓存在 analysis 上），耗时单独统计
+        shared = {"sentiment": lambda: sentiment.score_all(ctx.analysis)}
+        if scoring.enabled:
+            return self._score_offloaded(signals, budget, prepare, shared)
+        return self._conclude(self.scheduler.run(signals, budget, prepare, shared))
+
+    async def _score_offloaded(
+        self,
+        signals: list[Signal],
+        budget: float,
+        prepare: Callable[[], object],
+        shared: dict[str, Callable[[], object]],
+    ) -> StepResult:
+        try:
+            result = await scoring.run(
+                self.scheduler.run, signals, budget, prepare, shared
             )
-            if sim > self.cfg.similar:
-                return StepResult(wake=True, msg="相关性唤醒")
-        # 答疑唤醒
-        if self.cfg.ask < 1 and ctx.plain and sentiment.ask(ctx.plain) > self.cfg.ask:
-            return StepResult(wake=True, msg="答疑唤醒")
-        # 无聊唤醒
-        if (
-            self.cfg.bored < 1
-            and ctx.plain
-            and sentiment.bored(ctx.plain) > self.cfg.bored
-        ):
-            return StepResult(wake=True, msg="无聊唤醒")
-        # 兴趣唤醒
-        if (
-            self.cfg.interest < 1
-            and ctx.plain
-            and self.interest.calc_interest(ctx.plain) > self.cfg.interest
-        ):
-            return StepResult(wake=True, msg="兴趣唤醒")
-        # 概率唤醒
-        if self.cfg.prob > 0 and random.random() < self.cfg.prob:
-            return StepResult(wake=True, msg="概率唤醒")
+        except asyncio.TimeoutError:  # noqa: UP041
+            self._count_evaluated()
+            return StepResult(reason="scoring_timeout")
+        return self._conclude(result)
+
+    def _count_evaluated(self) -> None:
+        self._evaluated += 1
+        if self._evaluated % self.REPORT_EVERY == 0:
+            logger.info(f"唤醒信号统计：\n{self.scheduler.report()}")
+
+    def _conclude(self, result: ScheduleResult) -> StepResult:
+        self._count_evaluated()
+        if result.hit:
+            return StepResult(wake=True, reason=result.hit)
+        if result.over_budget:
+            return StepResult(reason="over_budget")
         return StepResult()
+
+    def _signals(
+        self, ctx: WakeContext, bot_msgs: list[BotMessageRecord], nlp: bool
+    ) -> list[Signal]:
+        """收集本条消息已启用的独立信号"""
+        signals: list[Signal] = []
+        if nlp:
+            # 相关性唤醒
+            if self.cfg.similar < 1 and bot_msgs:
+                signals.append(
+                    Signal(
+                        "similar",
+                        lambda: (
+                            self.similarity.similarity(ctx.gid, ctx.analysis, bot_msgs)
+                            > self.cfg.similar
+                        ),
+                        needs_prepare=True,
+                        # 因其他信号命中而未求值时仍计入滑动窗口，保持 IDF 统计与逐条求值时一致；
+                        # 超出信号预算时不再计入
+                        on_skip=lambda: self.similarity.observe(ctx.gid, ctx.analysis),
+                    )
+                )
+            # 答疑唤醒
+            if self.cfg.ask < 1:
+                signals.append(
+                    Signal(
+                        "ask",
+                        lambda: sentiment.ask(ctx.analysis) > self.cfg.ask,
+                        needs_prepare=True,
+                        shared="sentiment",
+                    )
+                )
+            # 无聊唤醒
+            if self.cfg.bored < 1:
+                signals.append(
+                    Signal(
+                        "bored",
+                        lambda: sentiment.bored(ctx.analysis) > self.cfg.bored,
+                        needs_prepare=True,
+                        shared="sentiment",
+                    )
+                )
+            # 兴趣唤醒
+            if self.cfg.interest < 1:
+                signals.append(
+                    Signal(
+                        "interest",
+                        lambda: (
+                            self.interest.calc_interest(ctx.analysis)
+                            > self.cfg.interest
+                        ),
+                        needs_prepare=True,
+                    )
+                )
+        # 概率唤醒
+        if self.cfg.prob > 0:
+            signals.append(Signal("prob", lambda: random.random() < self.cfg.prob))
+        return signals
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import TYPE_CHECKING
+
+from .metrics import outcome_of
+
+if TYPE_CHECKING:
+    from .config import TraceConfig
+    from .model import StepResult, WakeContext
+    from .step import BaseStep
+
+
+class TraceEntry:
+    """一条消息的完整决策过程（槽位预分配，重复使用）"""
+
+    __slots__ = ("gid", "plain", "seq", "steps", "stopped", "ts", "uid", "woken")
+
+    def __init__(self):
+        self.seq = 0
+        """写入序号，0 表示空槽位"""
+        self.ts = 0.0
+        self.gid = ""
+        self.uid = ""
+        self.plain = ""
+        self.steps: list[tuple[BaseStep, StepResult, float]] = []
+        """(步骤, 结果, 耗时秒)，说明文字在导出时才格式化"""
+        self.woken: bool | None = None
+        """流水线结束后的判定，None 表示尚未结束"""
+        self.stopped = False
+
+
+class DecisionTracer:
+    """
+    决策追踪环形缓冲区
+
+    - 按采样率随机抽取，或对指定群号 / 用户 ID 全量记录
+    - 槽位在首次使用时一次性分配，写满后覆盖最早的记录
+    - 只保存步骤结果的引用，说明文字在导出时才格式化
+    """
+
+    PLAIN_LIMIT = 60
+    """记录的消息文本最大长度"""
+
+    def __init__(self):
+        self.cfg: TraceConfig | None = None
+        self._slots: list[TraceEntry] = []
+        self._seq = 0
+        self._rng = random.Random()
+        self._targets: set[str] = set()
+        self._targets_src: tuple[int, int] | None = None
+
+    def configure(self, cfg: TraceConfig) -> None:
+        """绑定配置节点，之后每条消息都读取最新配置"""
+        self.cfg = cfg
+
+    @property
+    def enabled(self) -> bool:
+        cfg = self.cfg
+        return bool(cfg and cfg.capacity > 0 and (cfg.sample_rate > 0 or cfg.targets))
+
+    def _is_target(self, *values: str) -> bool:
+        assert self.cfg is not None
+        src = self.cfg.targets or []
+        key = (id(src), len(src))
+        if key != self._targets_src:
+            self._targets = {str(t) for t in src}
+            self._targets_src = key
+        return any(v in self._targets for v in values if v)
+
+    def begin(self, ctx: WakeContext) -> int:
+        """决定是否追踪该消息，追踪时返回写入序号，否则返回 0"""
+        cfg = self.cfg
+        assert cfg is not None
+        if not self._is_target(ctx.gid, ctx.uid) and not (
+            cfg.sample_rate > 0 and self._rng.random() < cfg.sample_rate
+        ):
+            return 0
+        if len(self._slots) != cfg.capacity:
+            self._slots = [TraceEntry() for _ in range(cfg.capacity)]
+        self._seq += 1
+        entry = self._slots[self._seq % len(self._slots)]
+        entry.seq = self._seq
+        entry.ts = ctx.now
+        entry.gid = ctx.gid
+        entry.uid = ctx.uid
+        entry.plain = ctx.plain[: self.PLAIN_LIMIT]
+        entry.steps.clear()
+        entry.woken = None
+        entry.stopped = False
+        return self._seq
+
+    def _entry(self, seq: int) -> TraceEntry | None:
+        """槽位已被更新的消息覆盖时返回 None"""
+        if not self._slots:
+            return None
+        entry = self._slots[seq % len(self._slots)]
+        return entry if entry.seq == seq else None
+
+    def add(self, seq: int, step: BaseStep, result: StepResult, elapsed: float):
+        entry = self._entry(seq)
+        if entry:
+            entry.steps.append((step, result, elapsed))
+
+    def finish(self, seq: int, ctx: WakeContext) -> None:
+        entry = self._entry(seq)
+        if entry:
+            entry.woken = bool(ctx.event.is_at_or_wake_command)
+            entry.stopped = ctx.event.is_stopped()
+
+    def clear(self) -> None:
+        for entry in self._slots:
+            entry.seq = 0
+            entry.steps.clear()
+
+    def dump(self, limit: int = 20, gid: str = "") -> str:
+        """按时间顺序导出最近 limit 条已结束的追踪，可按群号筛选"""
+        entries = sorted(
+            (
+                e
+                for e in self._slots
+                if e.seq and e.woken is not None and (not gid or e.gid == gid)
+            ),
+            key=lambda e: e.seq,
+        )[-limit:]
+        if not entries:
+            return "暂无追踪记录"
+        lines: list[str] = []
+        for e in entries:
+            verdict = "唤醒" if e.woken else "阻止" if e.stopped else "未唤醒"
+            stamp = time.strftime("%H:%M:%S", time.localtime(e.ts))
+            lines.append(f"[{stamp}] 群 {e.gid} 用户 {e.uid} → {verdict}：{e.plain}")
+            for step, result, elapsed in e.steps:
+                desc = step.describe(result)
+                lines.append(
+                    f"  {step.name.value} {outcome_of(result)} "
+                    f"{elapsed * 1e6:.0f}us{f' {desc}' if desc else ''}"
+                )
+        return "\n".join(lines)
+
+
+tracer = DecisionTracer()
@@ -1,5 +1,6 @@
 import time
 
+from astrbot.api import logger
 from astrbot.api.event import filter
 from astrbot.api.star import Context, Star
 from astrbot.core.config.astrbot_config import AstrBotConfig
@@ -10,20 +11,27 @@ from astrbot.core.star.filter.command_group import CommandGroupFilter
 from astrbot.core.star.star_handler import star_handlers_registry
 
 from .core.config import PluginConfig
-from .core.model import (
-    MemberState,
-    StateManager,
-    WakeContext,
-)
+from .core.metrics import metrics
+from .core.model import StateManager, WakeContext
 from .core.pipeline import Pipeline
+from .core.recorder import recorder
+from .core.trace import tracer
 
 
 class WakePlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
+        start = time.perf_counter()
         super().__init__(context)
         self.cfg = PluginConfig(config, context)
         self.commands = self._get_all_commands()
         self.pipeline = Pipeline(self.cfg)
+        logger.debug(f"WakePro 插件构建耗时 {time.perf_counter() - start:.3f} 秒")
+
+    async def initialize(self):
+        await self.pipeline.initialize()
+
+    async def terminate(self):
+        await self.pipeline.terminate()
 
     @staticmethod
     def _get_all_commands() -> list[str]:
@@ -50,7 +58,7 @@ class WakePlugin(Star):
         if uid == bid:
             return
 
-        if any(x in self.cfg.global_blacklist for x in (umo, uid, gid)):
+        if self.cfg.in_global_blacklist(umo, uid, gid):
             event.stop_event()
             return
 
@@ -60,9 +68,8 @@ class WakePlugin(Star):
         first_arg = event.message_str.split(" ", 1)[0]
         cmd = first_arg if first_arg in self.commands else None
 
-        group = StateManager.get_group(gid) if gid else None
-        if group and uid not in group.members:
-            group.members[uid] = MemberState(uid=uid)
+        now = time.time()
+        group = StateManager.get_group(gid, now) if gid else None
 
         ctx = WakeContext(
             event=event,
@@ -75,10 +82,12 @@ class WakePlugin(Star):
             uid=uid,
             bid=bid,
             group=group,
-            member=group.members[uid] if group else None,
-            now=time.time(),
+            member=StateManager.get_member(group, uid, now) if group else None,
+            now=now,
         )
         await self.pipeline.run(ctx)
+        if recorder.enabled:
+            recorder.record_message(ctx, plain, chain)
 
     @filter.on_decorating_result(priority=20)
     async def on_decorating_result(self, event: AstrMessageEvent):
@@ -96,9 +105,51 @@ class WakePlugin(Star):
         if not gid or not uid or not result:
             return
 
-        group = StateManager.get_group(gid)
-        group.bot_msgs.append(result.get_plain_text())
+        now = time.time()
+        text = result.get_plain_text()
+        group = StateManager.get_group(gid, now)
+        self.pipeline.record_bot_msg(group, text, now)
+        if recorder.enabled:
+            recorder.record_reply(event.unified_msg_origin, gid, uid, text, now)
 
         member = group.members.get(uid)
         if member:
-            member.last_reply = time.time()
+            async with StateManager.member_locks((gid, uid)):
+                StateManager.mark_reply(group, member, now)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("唤醒统计")
+    async def wake_stats(self, event: AstrMessageEvent):
+        """查看各步骤耗时、唤醒原因与事件计数"""
+        yield event.plain_result(metrics.summary())
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("唤醒追踪")
+    async def wake_trace(self, event: AstrMessageEvent, limit: int = 20, gid: str = ""):
+        """查看追踪缓冲区中最近的决策过程，可指定条数与群号，如：唤醒追踪 10 123456"""
+        if not tracer.enabled:
+            yield event.plain_result("未开启决策追踪，请在配置中设置采样率或追踪对象")
+            return
+        yield event.plain_result(tracer.dump(limit, str(gid)))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("沉默列表")
+    async def silence_list(self, event: AstrMessageEvent, gid: str = ""):
+        """查看群内当前仍在沉默的用户与剩余时间，默认为当前群，如：沉默列表 123456"""
+        now = time.time()
+        gid = str(gid) or event.get_group_id()
+        if not gid:
+            groups = StateManager.silenced_groups(now)
+            yield event.plain_result(
+                f"有沉默记录的群：{'、'.join(groups)}" if groups else "当前没有沉默记录"
+            )
+            return
+        entries = StateManager.silenced(gid, now)
+        if not entries:
+            yield event.plain_result(f"群 {gid} 当前没有沉默记录")
+            return
+        lines = [f"群 {gid} 沉默中："]
+        for uid, until in entries:
+            who = "整群闭嘴" if not uid else f"用户 {uid}"
+            lines.append(f"  {who}，剩余 {until - now:.0f} 秒")
+        yield event.plain_result("\n".join(lines))